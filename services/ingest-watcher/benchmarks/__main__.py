@@ -0,0 +1,100 @@
+"""Run the benchmark suite and compare it against the stored baselines.
+
+    uv run python -m benchmarks --entries 1000000 --check
+    uv run python -m benchmarks --entries 1000000 --update-baselines
+
+Baselines depend on the machine they were recorded on; record them again
+on the machine that runs the comparison.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import cast
+
+from benchmarks.bench_snapshot_state import (
+    IMPLEMENTATIONS,
+    METRICS,
+    find_regressions,
+    run_benchmarks,
+)
+from benchmarks.media_tree import LAYOUTS, Layout
+
+BASELINES_PATH = Path(__file__).parent / "baselines.json"
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="benchmarks", description=__doc__)
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--layout", action="append", choices=LAYOUTS, help="Default: all layouts"
+    )
+    parser.add_argument(
+        "--implementation",
+        action="append",
+        choices=sorted(IMPLEMENTATIONS),
+        help="Default: all implementations",
+    )
+    parser.add_argument("--baselines", type=Path, default=BASELINES_PATH)
+    parser.add_argument(
+        "--check", action="store_true", help="Exit with 1 on regressions"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Allowed slowdown over the baseline, as a fraction",
+    )
+    parser.add_argument("--update-baselines", action="store_true")
+    args = parser.parse_args(argv)
+
+    layouts = cast(list[Layout], args.layout or list(LAYOUTS))
+    implementations = args.implementation or sorted(IMPLEMENTATIONS)
+    results = run_benchmarks(
+        args.entries,
+        layouts,
+        implementations,
+        args.seed,
+        progress=lambda msg: print(msg, file=sys.stderr),
+    )
+
+    for name, by_layout in results.items():
+        for layout, metrics in by_layout.items():
+            print(f"{name} / {layout}")
+            for metric, value in metrics.items():
+                print(f"  {metric:<18} {value:>10.2f} {METRICS[metric]}")
+
+    baselines = (
+        json.loads(args.baselines.read_text(encoding="utf-8"))
+        if args.baselines.exists()
+        else {"entries": args.entries, "results": {}}
+    )
+
+    if args.update_baselines:
+        for name, by_layout in results.items():
+            for layout, metrics in by_layout.items():
+                baselines["results"].setdefault(name, {})[layout] = {
+                    metric: round(value, 3) for metric, value in metrics.items()
+                }
+        baselines["entries"] = args.entries
+        args.baselines.write_text(
+            json.dumps(baselines, indent=2, sort_keys=True) + "\n", encoding="utf-8"
+        )
+        return 0
+
+    if baselines["entries"] != args.entries:
+        print(
+            f"warning: baselines were recorded with {baselines['entries']} entries",
+            file=sys.stderr,
+        )
+    regressions = find_regressions(results, baselines["results"], args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+
+    return 1 if regressions and args.check else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,198 @@
+"""Scale benchmarks of SnapshotState implementations, Snapshot and diffing."""
+
+import gc
+import time
+import tracemalloc
+from collections.abc import Callable
+from typing import cast
+
+from benchmarks.media_tree import Layout, generate_churn, generate_media_tree
+from ingest_watcher.domain.entities import Snapshot, SnapshotEntryStats
+from ingest_watcher.domain.services import diff_snapshots
+from ingest_watcher.domain.snapshot_state import SnapshotState
+from ingest_watcher.infrastructure.in_memory_tree_snapshot_state import (
+    InMemoryTreeSnapshotState,
+)
+from ingest_watcher.infrastructure.sharded_snapshot_state import ShardedSnapshotState
+
+SnapshotStateFactory = Callable[[str], SnapshotState]
+
+ROOT = "/media"
+
+# every SnapshotState implementation the suite runs against
+IMPLEMENTATIONS: dict[str, SnapshotStateFactory] = {
+    "in_memory_tree": lambda root: cast(
+        SnapshotState, InMemoryTreeSnapshotState(root)
+    ),
+    "sharded": lambda root: cast(SnapshotState, ShardedSnapshotState(root)),
+    # the deep layout only has shows, movies and music at the top level
+    "sharded_depth_2": lambda root: cast(
+        SnapshotState, ShardedSnapshotState(root, shard_depth=2)
+    ),
+}
+
+# fraction of the tree touched per churn round, and rounds per layout
+CHURN_FRACTION = 0.3
+CHURN_ROUNDS: dict[Layout, int] = {"deep": 1, "wide": 1, "churn": 5}
+
+# metric name -> unit, lower is better for all of them
+METRICS = {
+    "add_us": "us/entry",
+    "get_all_files_us": "us/entry",
+    "update_us": "us/op",
+    "remove_us": "us/op",
+    "churn_add_us": "us/op",
+    "diff_us": "us/entry",
+    "snapshot_add_us": "us/entry",
+    "bytes_per_entry": "B/entry",
+    "largest_shard_share": "fraction",
+}
+
+BenchmarkResults = dict[str, dict[str, dict[str, float]]]
+
+
+def _timed(fn: Callable[[], object]) -> float:
+    gc.collect()
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def _build(
+    factory: SnapshotStateFactory, files: list[tuple[str, SnapshotEntryStats]]
+) -> SnapshotState:
+    state = factory(ROOT)
+    for path, stats in files:
+        state.add_file(path, stats)
+    return state
+
+
+def _bytes_per_entry(
+    factory: SnapshotStateFactory, files: list[tuple[str, SnapshotEntryStats]]
+) -> float:
+    """Measure the memory the state allocates per file, stats excluded."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        state = _build(factory, files)
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del state
+
+    return current / len(files)
+
+
+def _largest_shard_share(state: SnapshotState) -> float:
+    """Get the fraction of the entries the fullest shard holds, 1 unsharded."""
+    if not isinstance(state, ShardedSnapshotState):
+        return 1.0
+    counts = state.shard_entry_counts()
+    return max(counts) / max(sum(counts), 1)
+
+
+def bench_implementation(
+    factory: SnapshotStateFactory, layout: Layout, entries: int, seed: int = 0
+) -> dict[str, float]:
+    """Run every benchmark of one implementation on one layout."""
+    files = generate_media_tree(layout, entries, seed, ROOT)
+    results: dict[str, float] = {}
+
+    state = factory(ROOT)
+
+    def add_all() -> None:
+        for path, stats in files:
+            state.add_file(path, stats)
+
+    results["add_us"] = _timed(add_all) * 1e6 / len(files)
+    results["get_all_files_us"] = _timed(state.get_all_files) * 1e6 / len(files)
+    results["largest_shard_share"] = _largest_shard_share(state)
+
+    old = Snapshot(id="old", state_store=_build(factory, files))
+    elapsed = {"add": 0.0, "remove": 0.0, "update": 0.0}
+    counts = {"add": 0, "remove": 0, "update": 0}
+    current = files
+    for round in range(CHURN_ROUNDS[layout]):
+        operations = generate_churn(current, CHURN_FRACTION, seed + round, ROOT)
+        for kind in elapsed:
+            batch = [op for op in operations if op.kind == kind]
+
+            def apply() -> None:
+                for op in batch:
+                    match op.kind:
+                        case "add":
+                            state.add_file(op.path, op.stats)  # type: ignore[arg-type]
+                        case "remove":
+                            state.remove_file(op.path)
+                        case "update":
+                            state.update_file(op.path, op.stats)  # type: ignore[arg-type]
+
+            elapsed[kind] += _timed(apply)
+            counts[kind] += len(batch)
+        current = [
+            (path, cast(SnapshotEntryStats, state.get_stats(path)))
+            for path in state.get_all_files()
+        ]
+
+    results["churn_add_us"] = elapsed["add"] * 1e6 / max(counts["add"], 1)
+    results["remove_us"] = elapsed["remove"] * 1e6 / max(counts["remove"], 1)
+    results["update_us"] = elapsed["update"] * 1e6 / max(counts["update"], 1)
+
+    new = Snapshot(id="new", state_store=state)
+    results["diff_us"] = _timed(lambda: diff_snapshots(old, new)) * 1e6 / len(files)
+
+    snapshot = Snapshot(id="events", state_store=factory(ROOT))
+
+    def snapshot_add_all() -> None:
+        for path, stats in files:
+            snapshot.add_file(path, stats)
+        for _ in snapshot.pull_event_batches():
+            pass
+
+    results["snapshot_add_us"] = _timed(snapshot_add_all) * 1e6 / len(files)
+
+    del old, new, state, snapshot
+    results["bytes_per_entry"] = _bytes_per_entry(factory, files)
+
+    return results
+
+
+def run_benchmarks(
+    entries: int,
+    layouts: list[Layout],
+    implementations: list[str],
+    seed: int = 0,
+    progress: Callable[[str], None] | None = None,
+) -> BenchmarkResults:
+    """Run the suite, results are keyed by implementation then layout."""
+    results: BenchmarkResults = {}
+    for name in implementations:
+        for layout in layouts:
+            if progress is not None:
+                progress(f"{name} / {layout} / {entries} entries")
+            results.setdefault(name, {})[layout] = bench_implementation(
+                IMPLEMENTATIONS[name], layout, entries, seed
+            )
+
+    return results
+
+
+def find_regressions(
+    results: BenchmarkResults, baselines: BenchmarkResults, tolerance: float
+) -> list[str]:
+    """Compare results to baselines, describe every metric worse than allowed."""
+    regressions: list[str] = []
+    for name, layouts in results.items():
+        for layout, metrics in layouts.items():
+            baseline = baselines.get(name, {}).get(layout, {})
+            for metric, value in metrics.items():
+                expected = baseline.get(metric)
+                if expected is None or expected <= 0:
+                    continue
+                if value > expected * (1 + tolerance):
+                    regressions.append(
+                        f"{name}/{layout}/{metric}: {value:.2f} {METRICS[metric]}"
+                        f" vs baseline {expected:.2f} (+{value / expected - 1:.0%})"
+                    )
+
+    return regressions
@@ -0,0 +1,156 @@
+"""Deterministic generator of synthetic media trees for benchmarks."""
+
+import random
+from collections.abc import Iterator
+from dataclasses import dataclass
+from typing import Literal
+
+from ingest_watcher.domain.entities import SnapshotEntryStats
+
+Layout = Literal["deep", "wide", "churn"]
+LAYOUTS: tuple[Layout, ...] = ("deep", "wide", "churn")
+
+WORDS = [
+    "black", "blue", "city", "dark", "dead", "fire", "ghost", "gold", "house",
+    "iron", "king", "last", "light", "lost", "moon", "night", "north", "red",
+    "river", "road", "shadow", "silver", "sky", "star", "stone", "storm", "sun",
+    "town", "war", "water", "white", "wild", "wind", "winter", "wolf", "world",
+]  # fmt: skip
+
+VIDEO_MIME = "video/x-matroska"
+AUDIO_MIME = "audio/flac"
+IMAGE_MIME = "image/jpeg"
+SUBTITLE_MIME = "application/x-subrip"
+
+# files per directory in wide flat dumps
+WIDE_DIRECTORY_FILES = 10_000
+
+
+@dataclass(frozen=True, slots=True)
+class ChurnOperation:
+    """A change applied to a generated tree."""
+
+    kind: Literal["add", "remove", "update"]
+    path: str
+    stats: SnapshotEntryStats | None = None
+
+
+def _title(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS).capitalize() for _ in range(words))
+
+
+def _stats(rng: random.Random, size: int, mime: str) -> SnapshotEntryStats:
+    return SnapshotEntryStats(md5=f"{rng.getrandbits(128):032x}", size=size, mime=mime)
+
+
+def _deep_tree(
+    rng: random.Random, root: str
+) -> Iterator[tuple[str, SnapshotEntryStats]]:
+    """Shows/seasons/episodes, movie folders and artist/album/track libraries."""
+    n = 0
+    while True:
+        n += 1
+        kind = rng.random()
+        if kind < 0.6:
+            show = f"{_title(rng, rng.randint(1, 3))} {n:05d}"
+            for season in range(1, rng.randint(2, 8)):
+                season_dir = f"{root}/shows/{show}/Season {season:02d}"
+                for episode in range(1, rng.randint(6, 24)):
+                    name = f"{show} - S{season:02d}E{episode:02d}"
+                    yield (
+                        f"{season_dir}/{name}.mkv",
+                        _stats(rng, rng.randint(300 << 20, 4 << 30), VIDEO_MIME),
+                    )
+                    if rng.random() < 0.5:
+                        yield (
+                            f"{season_dir}/{name}.en.srt",
+                            _stats(
+                                rng, rng.randint(20 << 10, 120 << 10), SUBTITLE_MIME
+                            ),
+                        )
+        elif kind < 0.8:
+            movie = f"{_title(rng, rng.randint(1, 4))} ({rng.randint(1950, 2025)})"
+            yield (
+                f"{root}/movies/{movie}/{movie}.mkv",
+                _stats(rng, rng.randint(1 << 30, 60 << 30), VIDEO_MIME),
+            )
+        else:
+            artist = f"{_title(rng, rng.randint(1, 2))} {n:05d}"
+            for album in range(rng.randint(1, 5)):
+                album_dir = f"{root}/music/{artist}/{_title(rng, 2)} {album}"
+                for track in range(1, rng.randint(8, 16)):
+                    yield (
+                        f"{album_dir}/{track:02d} - {_title(rng, 3)}.flac",
+                        _stats(rng, rng.randint(15 << 20, 60 << 20), AUDIO_MIME),
+                    )
+
+
+def _wide_tree(
+    rng: random.Random, root: str
+) -> Iterator[tuple[str, SnapshotEntryStats]]:
+    """Camera dumps: a few huge flat directories."""
+    n = 0
+    while True:
+        directory = f"{root}/dumps/import-{n // WIDE_DIRECTORY_FILES:04d}"
+        yield (
+            f"{directory}/IMG_{n:08d}.jpg",
+            _stats(rng, rng.randint(2 << 20, 12 << 20), IMAGE_MIME),
+        )
+        n += 1
+
+
+def generate_media_tree(
+    layout: Layout, entries: int, seed: int = 0, root: str = "/media"
+) -> list[tuple[str, SnapshotEntryStats]]:
+    """Generate `entries` files of a layout, the same for the same seed.
+
+    The churn layout starts from the deep layout; apply
+    `generate_churn` to it for the heavy-churn workload.
+    """
+    rng = random.Random(f"{layout}:{seed}")
+    tree = _wide_tree(rng, root) if layout == "wide" else _deep_tree(rng, root)
+
+    files: list[tuple[str, SnapshotEntryStats]] = []
+    seen: set[str] = set()
+    for path, stats in tree:
+        # titles are random and may repeat, keep the first file of a path
+        if path in seen:
+            continue
+        seen.add(path)
+        files.append((path, stats))
+        if len(files) >= entries:
+            break
+
+    return files
+
+
+def generate_churn(
+    files: list[tuple[str, SnapshotEntryStats]],
+    fraction: float = 0.3,
+    seed: int = 0,
+    root: str = "/media",
+) -> list[ChurnOperation]:
+    """Generate removes, updates and adds touching `fraction` of the files."""
+    rng = random.Random(f"churn:{seed}")
+    touched = rng.sample(range(len(files)), int(len(files) * fraction))
+
+    operations: list[ChurnOperation] = []
+    for i, index in enumerate(touched):
+        path, stats = files[index]
+        match i % 3:
+            case 0:
+                operations.append(ChurnOperation("remove", path))
+            case 1:
+                operations.append(
+                    ChurnOperation("update", path, _stats(rng, stats.size, stats.mime))
+                )
+            case _:
+                operations.append(
+                    ChurnOperation(
+                        "add",
+                        f"{root}/incoming/{seed:03d}/{i % 97:02d}/{i:08d}.mkv",
+                        _stats(rng, rng.randint(300 << 20, 4 << 30), VIDEO_MIME),
+                    )
+                )
+
+    return operations
@@ -1,21 +1,268 @@
 import argparse
+import os
+from typing import TYPE_CHECKING
+
+# Keep the module level imports to the standard library: pydantic, watchdog
+# and the domain are imported by the commands that need them, so `--help`
+# and cheap commands stay fast for cron jobs and health checks.
+
+if TYPE_CHECKING:
+    from ingest_watcher.domain.entities import Snapshot
+
+
+def _load_snapshot(target: str) -> "Snapshot":
+    """Load a snapshot from a manifest file or by scanning a directory."""
+    from pathlib import Path
+
+    from ingest_watcher.bootstrap import IngestWatcherConfig, build_app
+    from ingest_watcher.infrastructure.file_snapshot_repository import (
+        FileSnapshotRepository,
+    )
+    from ingest_watcher.infrastructure.in_memory_tree_snapshot_state import (
+        InMemoryTreeSnapshotState,
+    )
+
+    if os.path.isdir(target):
+        # diff loads two snapshots, they must not both bind the metrics port
+        config = IngestWatcherConfig(
+            root_path=os.path.abspath(target), metrics_port=None
+        )
+        app = build_app(config)
+        try:
+            app.scan(process_events=False)
+        finally:
+            app.close()
+        return app.snapshot
+
+    path = Path(target)
+    repository = FileSnapshotRepository(path.parent, InMemoryTreeSnapshotState)
+    return repository.load(path)
 
-from ingest_watcher.bootstrap import IngestWatcherConfig, build_app
 
 def cmd_watch(args: argparse.Namespace) -> int:
-    """Watch the root path for changes and ingest the changes."""
-    
-    config = IngestWatcherConfig(root_path=args.root_path)
+    """Watch the root paths for changes and ingest the changes."""
+    import sys
+    import threading
+
+    from ingest_watcher.bootstrap import IngestWatcherConfig, build_app
+    from ingest_watcher.profiling import install_signal_handlers
+
+    root_path, *root_paths = (os.path.abspath(p) for p in args.root_paths)
+    config = IngestWatcherConfig(
+        root_path=root_path, **({"root_paths": root_paths} if root_paths else {})
+    )
+    install_signal_handlers()
+
+    if config.root_paths:
+        from ingest_watcher.supervisor import RootSupervisor
+
+        supervisor = RootSupervisor(config)
+        print(f"Watching {', '.join(supervisor.root_paths)} for changes...")
+        try:
+            supervisor.run(threading.Event())
+        except KeyboardInterrupt:
+            pass
+        return 0
+
     app = build_app(config)
+    print(f"Watching {config.root_path} for changes...")
+    try:
+        app.watch(threading.Event())
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        print(f"Watching {config.root_path} failed: {e}", file=sys.stderr)
+        return 1
+    finally:
+        app.close()
+    return 0
 
-    print(f"Watching {args.root_path} for changes...")
+
+def cmd_scan(args: argparse.Namespace) -> int:
+    """Scan the root path once and print or save the snapshot."""
+    from pathlib import Path
+
+    from ingest_watcher.bootstrap import IngestWatcherConfig, build_app
+    from ingest_watcher.infrastructure.file_snapshot_repository import (
+        FileSnapshotRepository,
+    )
+    from ingest_watcher.infrastructure.in_memory_tree_snapshot_state import (
+        InMemoryTreeSnapshotState,
+    )
+    from ingest_watcher.profiling import install_signal_handlers
+
+    options = {
+        "scan_checkpoint_path": args.checkpoint,
+        "scan_progress_path": args.progress_file,
+    }
+    config = IngestWatcherConfig(
+        root_path=os.path.abspath(args.root_path),
+        **{k: v for k, v in options.items() if v is not None},
+    )
+    app = build_app(config)
+    install_signal_handlers()
+    try:
+        app.scan(process_events=not args.quiet)
+    finally:
+        app.close()
+
+    if args.output is not None:
+        repository = FileSnapshotRepository(
+            Path(args.output), InMemoryTreeSnapshotState
+        )
+        repository.save(app.snapshot)
+        print(repository.path_for(app.snapshot.id))
     return 0
 
-def main() -> int:
-    """Ingest Watcher main function."""
-    
-    print("Hello, World!")
+
+def cmd_diff(args: argparse.Namespace) -> int:
+    """Print the changes between two snapshots."""
+    from ingest_watcher.application.instrumentation import process_events
+    from ingest_watcher.domain.services import diff_snapshots, dummy_event_processor
+    from ingest_watcher.profiling import PHASE_DIFF, phase
+
+    old = _load_snapshot(args.old)
+    new = _load_snapshot(args.new)
+    with phase(PHASE_DIFF):
+        events = diff_snapshots(old, new)
+    process_events(events, dummy_event_processor)
+
+    return 1 if events and args.exit_code else 0
+
+
+def cmd_stats(args: argparse.Namespace) -> int:
+    """Print file, directory and size totals of a snapshot."""
+    snapshot = _load_snapshot(args.target)
+
+    files = snapshot.get_all_files()
+    total_size = 0
+    for path in files:
+        stats = snapshot.get_stats(path)
+        if stats is not None:
+            total_size += stats.size
+
+    directories = 0
+    stack = [snapshot.root_path]
+    while stack:
+        children = snapshot.get_children(stack.pop())
+        for child in children:
+            if snapshot.get_stats(child) is None:
+                directories += 1
+                stack.append(child)
+
+    print(f"root: {snapshot.root_path}")
+    print(f"files: {len(files)}")
+    print(f"directories: {directories}")
+    print(f"bytes: {total_size}")
+    return 0
+
+
+def cmd_progress(args: argparse.Namespace) -> int:
+    """Print the progress of a running or finished scan."""
+    from pathlib import Path
+
+    from ingest_watcher.infrastructure.scan_progress import ScanProgress
+
+    progress = ScanProgress.read(Path(args.progress_file))
+    eta = progress.eta_seconds
+
+    print(f"root: {progress.root_path}")
+    print(f"entries: {progress.entries_done}")
+    print(f"files: {progress.files_done}")
+    print(f"bytes: {progress.bytes_done}")
+    if progress.bytes_total is not None:
+        print(f"bytes estimated: {progress.bytes_total}")
+    print(f"hash rate: {progress.hash_rate / (1024 * 1024):.1f} MiB/s")
+    print(f"eta: {'unknown' if eta is None else f'{eta:.0f}s'}")
+    print(f"finished: {'yes' if progress.finished else 'no'}")
     return 0
 
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the command line parser."""
+    parser = argparse.ArgumentParser(
+        prog="ingest_watcher", description="Watch media folders and ingest changes."
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile the command with cProfile, SIGUSR1 toggles it while "
+        "watching or scanning and SIGUSR2 writes a memory snapshot",
+    )
+    parser.add_argument(
+        "--profile-dir", help="Directory to write profiles and memory snapshots to"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    watch = commands.add_parser("watch", help=cmd_watch.__doc__)
+    watch.add_argument(
+        "root_paths",
+        nargs="+",
+        metavar="root_path",
+        help="Directory to watch, several are watched by a process each",
+    )
+    watch.set_defaults(func=cmd_watch)
+
+    scan = commands.add_parser("scan", help=cmd_scan.__doc__)
+    scan.add_argument("root_path", help="Directory to scan")
+    scan.add_argument(
+        "-o", "--output", help="Directory to save the snapshot manifest into"
+    )
+    scan.add_argument(
+        "-q", "--quiet", action="store_true", help="Do not print the events"
+    )
+    scan.add_argument(
+        "--checkpoint", help="Checkpoint file to resume an interrupted scan from"
+    )
+    scan.add_argument(
+        "--progress-file", help="File to periodically write the scan progress to"
+    )
+    scan.set_defaults(func=cmd_scan)
+
+    diff = commands.add_parser("diff", help=cmd_diff.__doc__)
+    diff.add_argument("old", help="Snapshot manifest or directory")
+    diff.add_argument("new", help="Snapshot manifest or directory")
+    diff.add_argument(
+        "--exit-code",
+        action="store_true",
+        help="Exit with 1 when the snapshots differ",
+    )
+    diff.set_defaults(func=cmd_diff)
+
+    stats = commands.add_parser("stats", help=cmd_stats.__doc__)
+    stats.add_argument("target", help="Snapshot manifest or directory")
+    stats.set_defaults(func=cmd_stats)
+
+    progress = commands.add_parser("progress", help=cmd_progress.__doc__)
+    progress.add_argument("progress_file", help="Progress file written by a scan")
+    progress.set_defaults(func=cmd_progress)
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Ingest Watcher main function."""
+
+    args = build_parser().parse_args(argv)
+    if not args.profile and args.profile_dir is None:
+        return args.func(args)
+
+    import sys
+    from pathlib import Path
+
+    from ingest_watcher.profiling import PROFILER
+
+    if args.profile_dir is not None:
+        PROFILER.output_dir = Path(args.profile_dir)
+    if args.profile:
+        PROFILER.start()
+    try:
+        return args.func(args)
+    finally:
+        path = PROFILER.stop()
+        if path is not None:
+            print(f"Profile written to {path}", file=sys.stderr)
+
+
 if __name__ == "__main__":
     raise SystemExit(main())
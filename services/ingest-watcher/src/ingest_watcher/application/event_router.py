@@ -0,0 +1,220 @@
+import logging
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+
+from ingest_watcher.domain.events import SnapshotEvent, SnapshotEventType
+from ingest_watcher.domain.paths import normalize_path
+from ingest_watcher.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+EventBatchHandler = Callable[[list[SnapshotEvent]], None]
+
+ROUTED_EVENTS = REGISTRY.counter(
+    "ingest_watcher_routed_events_total",
+    "Events delivered to event router subscribers.",
+    ["subscriber"],
+)
+UNROUTED_EVENTS = REGISTRY.counter(
+    "ingest_watcher_unrouted_events_total",
+    "Events no event router subscriber matched.",
+)
+
+
+class SubscriberError(Exception):
+    """Raised when subscribers failed to handle batches of events."""
+
+
+@dataclass(frozen=True, slots=True)
+class SubscriberStats:
+    """Delivery counters of a subscriber."""
+
+    delivered: int
+    batches: int
+    failed_batches: int
+    pending: int
+    seconds: float
+
+
+class Subscription:
+    """A handler receiving batches of the events matching its filters."""
+
+    def __init__(
+        self,
+        name: str,
+        handler: EventBatchHandler,
+        prefixes: tuple[str, ...],
+        event_types: frozenset[SnapshotEventType] | None,
+        batch_size: int,
+    ) -> None:
+        self.name = name
+        self.handler = handler
+        self.prefixes = prefixes
+        self.event_types = event_types
+        self.batch_size = batch_size
+        self.pending: list[SnapshotEvent] = []
+        self.delivered = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.seconds = 0.0
+        self._routed = ROUTED_EVENTS.labels(name)
+
+    def deliver(self) -> BaseException | None:
+        """Hand the pending events to the handler, return what it raised."""
+        batch, self.pending = self.pending, []
+        start = time.perf_counter()
+        try:
+            self.handler(batch)
+        except Exception as e:
+            self.failed_batches += 1
+            logger.exception("Subscriber %s failed to handle events", self.name)
+            return e
+        finally:
+            self.seconds += time.perf_counter() - start
+
+        self.batches += 1
+        self.delivered += len(batch)
+        self._routed.inc(len(batch))
+        return None
+
+    @property
+    def stats(self) -> SubscriberStats:
+        return SubscriberStats(
+            delivered=self.delivered,
+            batches=self.batches,
+            failed_batches=self.failed_batches,
+            pending=len(self.pending),
+            seconds=self.seconds,
+        )
+
+
+class _TrieNode:
+    __slots__ = ("children", "subscriptions")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _TrieNode] = {}
+        self.subscriptions: list[Subscription] = []
+
+
+def _segments(path: str) -> list[str]:
+    return [segment for segment in path.split("/") if segment]
+
+
+class EventRouter:
+    """Buffered event processor routing events to subscribers by path prefix.
+
+    Subscriptions are kept in a trie of path segments, an event walks the
+    segments of its own path once and reaches only the subscribers of the
+    prefixes along it. Every subscriber has its own batch of pending events,
+    handed over once it is full or on `flush`. Not thread safe, events must
+    be routed from one thread at a time.
+    """
+
+    def __init__(self) -> None:
+        self._root = _TrieNode()
+        self._subscriptions: dict[str, Subscription] = {}
+        self._errors: list[BaseException] = []
+
+    def subscribe(
+        self,
+        name: str,
+        handler: EventBatchHandler,
+        prefixes: Iterable[str] = ("/",),
+        event_types: Iterable[SnapshotEventType] | None = None,
+        batch_size: int = 1,
+    ) -> Subscription:
+        """Deliver the events under any of the prefixes to a handler.
+
+        Prefixes match whole path segments, `/media/movies` does not match
+        `/media/movies2`. Events of any type are delivered unless
+        `event_types` is given.
+        """
+        if name in self._subscriptions:
+            raise ValueError(f"Subscriber {name} is already subscribed")
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be at least 1, got {batch_size}")
+
+        subscription = Subscription(
+            name,
+            handler,
+            tuple(dict.fromkeys(normalize_path(p) for p in prefixes)),
+            frozenset(event_types) if event_types is not None else None,
+            batch_size,
+        )
+        for prefix in subscription.prefixes:
+            node = self._root
+            for segment in _segments(prefix):
+                node = node.children.setdefault(segment, _TrieNode())
+            node.subscriptions.append(subscription)
+        self._subscriptions[name] = subscription
+
+        return subscription
+
+    def unsubscribe(self, name: str) -> None:
+        """Deliver the pending events of a subscriber and remove it."""
+        subscription = self._subscriptions.pop(name)
+        if subscription.pending:
+            self._record(subscription.deliver())
+
+        for prefix in subscription.prefixes:
+            segments = _segments(prefix)
+            nodes = [self._root]
+            for segment in segments:
+                nodes.append(nodes[-1].children[segment])
+            nodes[-1].subscriptions.remove(subscription)
+            # drop the branch left without subscribers, deepest node first
+            for depth in range(len(segments), 0, -1):
+                node = nodes[depth]
+                if node.subscriptions or node.children:
+                    break
+                del nodes[depth - 1].children[segments[depth - 1]]
+
+    def _record(self, error: BaseException | None) -> None:
+        if error is not None:
+            self._errors.append(error)
+
+    def _match(self, path: str) -> list[Subscription]:
+        """Get the subscriptions of the prefixes of a path, each only once."""
+        node = self._root
+        matched = list(node.subscriptions)
+        for segment in _segments(path):
+            child = node.children.get(segment)
+            if child is None:
+                break
+            node = child
+            matched.extend(node.subscriptions)
+
+        # a subscriber matches several times if its prefixes are nested
+        return list(dict.fromkeys(matched)) if len(matched) > 1 else matched
+
+    def __call__(self, event: SnapshotEvent) -> None:
+        matched = False
+        for subscription in self._match(event.path):
+            types = subscription.event_types
+            if types is not None and event.event_type not in types:
+                continue
+            matched = True
+            subscription.pending.append(event)
+            if len(subscription.pending) >= subscription.batch_size:
+                self._record(subscription.deliver())
+        if not matched:
+            UNROUTED_EVENTS.inc()
+
+    def flush(self) -> None:
+        """Deliver the pending events of every subscriber.
+
+        Raises SubscriberError if a subscriber failed to handle a batch
+        since the last flush, the other subscribers still got theirs.
+        """
+        for subscription in self._subscriptions.values():
+            if subscription.pending:
+                self._record(subscription.deliver())
+
+        errors, self._errors = self._errors, []
+        if errors:
+            raise SubscriberError(f"{len(errors)} batches failed") from errors[0]
+
+    def stats(self) -> dict[str, SubscriberStats]:
+        """Get the delivery counters of every subscriber."""
+        return {name: s.stats for name, s in self._subscriptions.items()}
@@ -0,0 +1,86 @@
+"""Metrics and profiling phases of snapshot event handling.
+
+The domain stays free of instrumentation: events are counted here as they
+enter the event buffer the application gives a snapshot, and as the
+application pulls and processes them.
+"""
+
+import time
+from collections.abc import Callable, Iterable, Iterator
+
+from ingest_watcher.domain.event_buffer import SnapshotEventBuffer
+from ingest_watcher.domain.events import SnapshotEvent, SnapshotEventType
+from ingest_watcher.domain.services import process_snapshot_events
+from ingest_watcher.metrics import REGISTRY
+from ingest_watcher.profiling import PHASE_EVENT_PROCESSING, phase
+
+SNAPSHOT_EVENTS = REGISTRY.counter(
+    "ingest_watcher_snapshot_events_total",
+    "Events emitted by snapshot mutations.",
+    ["event_type"],
+)
+SNAPSHOT_EVENTS_PULLED = REGISTRY.counter(
+    "ingest_watcher_snapshot_events_pulled_total",
+    "Events pulled from snapshots for processing.",
+)
+EVENTS_PROCESSED = REGISTRY.counter(
+    "ingest_watcher_events_processed_total", "Events handed to event processors."
+)
+EVENT_PROCESSING_SECONDS = REGISTRY.histogram(
+    "ingest_watcher_event_processing_seconds",
+    "Time spent processing a batch of snapshot events.",
+)
+_SNAPSHOT_EVENTS_BY_TYPE = {
+    t: SNAPSHOT_EVENTS.labels(t.value) for t in SnapshotEventType
+}
+
+
+class CountingEventBuffer:
+    """Event buffer counting the events snapshot mutations emit into it."""
+
+    def __init__(self, buffer: SnapshotEventBuffer) -> None:
+        self._buffer = buffer
+
+    def append(self, event: SnapshotEvent) -> None:
+        """Count an event and append it to the wrapped buffer."""
+        _SNAPSHOT_EVENTS_BY_TYPE[event.event_type].inc()
+        self._buffer.append(event)
+
+    def __len__(self) -> int:
+        """Get the number of buffered events."""
+        return len(self._buffer)
+
+    def drain(self) -> Iterator[SnapshotEvent]:
+        """Detach the buffered events and iterate over them in order."""
+        return self._buffer.drain()
+
+
+def count_pulled_events(
+    batches: Iterable[list[SnapshotEvent]],
+) -> Iterator[list[SnapshotEvent]]:
+    """Count the events of batches pulled from a snapshot as they pass."""
+    for batch in batches:
+        SNAPSHOT_EVENTS_PULLED.inc(len(batch))
+        yield batch
+
+
+def process_events(
+    events: Iterable[SnapshotEvent], processor: Callable[[SnapshotEvent], None]
+) -> None:
+    """Process snapshot events, measuring them for metrics and profiles."""
+    processed = 0
+
+    def counted() -> Iterator[SnapshotEvent]:
+        nonlocal processed
+        for event in events:
+            yield event
+            # resumed once the processor handled the event
+            processed += 1
+
+    start = time.perf_counter()
+    try:
+        with phase(PHASE_EVENT_PROCESSING):
+            process_snapshot_events(counted(), processor)
+    finally:
+        EVENTS_PROCESSED.inc(processed)
+        EVENT_PROCESSING_SECONDS.observe(time.perf_counter() - start)
@@ -1,14 +1,300 @@
-from dataclasses import dataclass
+import threading
+from collections.abc import Callable
+from datetime import UTC, datetime
+from pathlib import Path
 
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
-@dataclass
-class IngestWatcherConfig:
+from ingest_watcher.application.instrumentation import (
+    CountingEventBuffer,
+    count_pulled_events,
+    process_events,
+)
+from ingest_watcher.domain.entities import Snapshot
+from ingest_watcher.domain.event_buffer import InMemoryEventBuffer
+from ingest_watcher.domain.events import SnapshotEvent
+from ingest_watcher.domain.services import dummy_event_processor
+from ingest_watcher.infrastructure.event_journal import EventJournal, JournalConsumer
+from ingest_watcher.infrastructure.file_scanner import scan_tree
+from ingest_watcher.infrastructure.http_event_delivery import HttpEventDelivery
+from ingest_watcher.infrastructure.in_memory_tree_snapshot_state import (
+    InMemoryTreeSnapshotState,
+)
+from ingest_watcher.infrastructure.metrics_server import (
+    MetricsServer,
+    start_metrics_server,
+)
+from ingest_watcher.infrastructure.scan_checkpoint import ScanCheckpoint
+from ingest_watcher.infrastructure.scan_progress import (
+    ScanProgress,
+    ScanProgressReporter,
+    estimate_total_bytes,
+)
+from ingest_watcher.infrastructure.sharded_snapshot_state import ShardedSnapshotState
+from ingest_watcher.infrastructure.spilling_event_buffer import SpillingEventBuffer
+from ingest_watcher.metrics import REGISTRY
+from ingest_watcher.profiling import PROFILER
+
+PENDING_EVENTS = REGISTRY.gauge(
+    "ingest_watcher_pending_events", "Snapshot events waiting to be processed."
+)
+SNAPSHOT_ENTRIES = REGISTRY.gauge(
+    "ingest_watcher_snapshot_entries", "Files and directories in the snapshot."
+)
+SNAPSHOT_TOMBSTONES = REGISTRY.gauge(
+    "ingest_watcher_snapshot_tombstones",
+    "Removed snapshot entries still holding memory.",
+)
+
+
+class IngestWatcherConfig(BaseSettings):
     """Configuration for the ingest watcher."""
 
+    model_config = SettingsConfigDict(env_prefix="INGEST_WATCHER_")
+
     root_path: str
+    # further roots watched along with root_path, every root then gets a
+    # worker process of its own
+    root_paths: list[str] = []
+    # delay before restarting a crashed root worker, doubled for every crash
+    # in a row up to the maximum
+    worker_restart_delay: float = 1.0
+    worker_restart_max_delay: float = 60.0
+    # directory of the durable event journal, events are only kept in
+    # memory until processed when unset
+    journal_path: str | None = None
+    journal_consumer: str = "ingest"
+    # events kept in memory before the rest spill to a temporary file,
+    # unbounded when unset
+    event_buffer_max_events: int | None = None
+    event_spill_dir: str | None = None
+    event_batch_size: int = 1000
+    # shards of a thread-safe state shared by several threads, a single
+    # unsynchronized state when unset
+    state_shards: int | None = None
+    # levels below the root the state is sharded at, raise it when the root
+    # holds only a few libraries like movies, music and photos
+    state_shard_depth: int = 1
+    # log of scan progress a restarted scan resumes from, scans start over
+    # when unset
+    scan_checkpoint_path: str | None = None
+    scan_checkpoint_interval: float = 30.0
+    # JSON file the scan progress is periodically written to
+    scan_progress_path: str | None = None
+    scan_progress_interval: float = 5.0
+    # port of the Prometheus metrics endpoint, disabled when unset; with
+    # several roots the worker of each serves its own on the following ports
+    metrics_port: int | None = None
+    metrics_host: str = "127.0.0.1"
+    # ingest API endpoint events are POSTed to in batches, events are
+    # printed when unset
+    ingest_url: str | None = None
+    ingest_batch_size: int = 500
+    ingest_batch_interval: float = 1.0
+    ingest_max_connections: int = 4
+    ingest_max_retries: int = 5
+    # directory profiles and memory snapshots are written to, a directory
+    # in the system temporary directory when unset
+    profile_dir: str | None = None
+
 
 class IngestWatcherApp:
-    ...
+    """Ingest watcher application wiring a snapshot to the file system."""
+
+    def __init__(
+        self,
+        config: IngestWatcherConfig,
+        snapshot: Snapshot,
+        processor: Callable[[SnapshotEvent], None] = dummy_event_processor,
+        journal: EventJournal | None = None,
+        metrics_server: MetricsServer | None = None,
+    ) -> None:
+        self._config = config
+        self._snapshot = snapshot
+        self._processor = processor
+        self._journal = journal
+        self._metrics_server = metrics_server
+        self._consumer = (
+            JournalConsumer(journal, config.journal_consumer)
+            if journal is not None
+            else None
+        )
+        # reentrant: checkpoints process events in the middle of a scan
+        self._lock = threading.RLock()
+        self._process_lock = threading.Lock()
+
+    @property
+    def snapshot(self) -> Snapshot:
+        return self._snapshot
+
+    def scan(self, process_events: bool = True) -> None:
+        """Scan the root path and process, or drop, the resulting events.
+
+        With a checkpoint configured, a scan interrupted before completion
+        resumes where it stopped instead of starting over.
+        """
+        handle_events = self.process_events if process_events else self._drop_events
+        root_path = self._config.root_path
+
+        progress = ScanProgress(root_path=root_path)
+        reporter = None
+        if self._config.scan_progress_path is not None:
+            progress_path = Path(self._config.scan_progress_path)
+            progress.bytes_total = estimate_total_bytes(root_path, progress_path)
+            reporter = ScanProgressReporter(
+                progress_path, self._config.scan_progress_interval
+            )
+        checkpoint = (
+            ScanCheckpoint(
+                Path(self._config.scan_checkpoint_path),
+                self._config.scan_checkpoint_interval,
+                before_commit=handle_events,
+            )
+            if self._config.scan_checkpoint_path is not None
+            else None
+        )
+
+        with self._lock:
+            if checkpoint is not None:
+                checkpoint.restore(self._snapshot, progress)
+            scan_tree(root_path, self._snapshot, checkpoint, progress, reporter)
+        handle_events()
+
+        if checkpoint is not None:
+            checkpoint.clear()
+
+    def _drop_events(self) -> None:
+        with self._lock:
+            batches = self._snapshot.pull_event_batches(self._config.event_batch_size)
+            for _ in count_pulled_events(batches):
+                pass
+
+    def process_events(self) -> None:
+        """Process the pending events of the snapshot.
+
+        With a journal the events are made durable first and processed from
+        the journal, so events left unprocessed by a crash are replayed.
+        """
+        batch_size = self._config.event_batch_size
+        with self._lock:
+            batches = count_pulled_events(
+                self._snapshot.pull_event_batches(batch_size)
+            )
+            if self._journal is not None:
+                for batch in batches:
+                    self._journal.append_batch(batch)
+        if self._journal is None or self._consumer is None:
+            for batch in batches:
+                process_events(batch, self._processor)
+            return
+
+        self._journal.sync()
+        with self._process_lock:
+            try:
+                while records := self._consumer.poll(batch_size):
+                    process_events((event for _, event in records), self._processor)
+                    self._consumer.commit()
+            except BaseException:
+                # the failed records are polled again by the next call
+                self._consumer.rewind()
+                raise
+            finally:
+                self._journal.remove_segments_before(self._consumer.committed_offset)
+
+    def close(self) -> None:
+        """Release the journal, delivery connections and metrics endpoint."""
+        if isinstance(self._processor, HttpEventDelivery):
+            self._processor.close()
+        if self._metrics_server is not None:
+            self._metrics_server.stop()
+            self._metrics_server = None
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+            self._consumer = None
+
+    def watch(self, stop: threading.Event) -> None:
+        """Scan the root path, then watch it for changes until stopped.
+
+        Raises the first error of applying or processing a change, as the
+        watcher cannot tell which changes are still missing after it.
+        """
+        from ingest_watcher.infrastructure.file_watcher import start_file_watcher
+
+        self.scan()
+        observer, handler = start_file_watcher(
+            self._config.root_path, self._snapshot, self.process_events
+        )
+        try:
+            while not stop.wait(1):
+                if handler.error is not None:
+                    raise handler.error
+                if not observer.is_alive():
+                    raise RuntimeError(f"Watcher of {self._config.root_path} died")
+        finally:
+            observer.stop()
+            observer.join()
+
+
+def new_snapshot_id() -> str:
+    """Generate a sortable snapshot id from the current time."""
+    return datetime.now(UTC).strftime("%Y%m%dT%H%M%S%fZ")
+
+
+def build_processor(config: IngestWatcherConfig) -> Callable[[SnapshotEvent], None]:
+    """Build the processor delivering events to the configured ingest API."""
+    if config.ingest_url is None:
+        return dummy_event_processor
+    return HttpEventDelivery(
+        config.ingest_url,
+        batch_size=config.ingest_batch_size,
+        batch_interval=config.ingest_batch_interval,
+        max_connections=config.ingest_max_connections,
+        max_retries=config.ingest_max_retries,
+    )
+
+
+def build_app(
+    config: IngestWatcherConfig,
+    processor: Callable[[SnapshotEvent], None] | None = None,
+) -> IngestWatcherApp:
+    """Build the ingest watcher application from its configuration."""
+    if processor is None:
+        processor = build_processor(config)
+    event_buffer = CountingEventBuffer(
+        SpillingEventBuffer(config.event_buffer_max_events, config.event_spill_dir)
+        if config.event_buffer_max_events is not None
+        else InMemoryEventBuffer()
+    )
+    state_store = (
+        ShardedSnapshotState(
+            config.root_path,
+            config.state_shards,
+            shard_depth=config.state_shard_depth,
+        )
+        if config.state_shards is not None
+        else InMemoryTreeSnapshotState(config.root_path)
+    )
+    snapshot = Snapshot(
+        id=new_snapshot_id(),
+        state_store=state_store,
+        event_buffer=event_buffer,
+    )
+    journal = (
+        EventJournal(Path(config.journal_path))
+        if config.journal_path is not None
+        else None
+    )
+
+    if config.profile_dir is not None:
+        PROFILER.output_dir = Path(config.profile_dir)
+    PENDING_EVENTS.set_function(lambda: snapshot.pending_events)
+    SNAPSHOT_ENTRIES.set_function(state_store.entry_count)
+    SNAPSHOT_TOMBSTONES.set_function(state_store.tombstone_count)
+    metrics_server = (
+        start_metrics_server(config.metrics_host, config.metrics_port)
+        if config.metrics_port is not None
+        else None
+    )
 
-def build_app(config: IngestWatcherConfig) -> IngestWatcherApp | None:
-    ...
+    return IngestWatcherApp(config, snapshot, processor, journal, metrics_server)
@@ -1,6 +1,11 @@
+from collections.abc import Iterator
+from itertools import batched
+
 from pydantic import BaseModel, Field, field_validator
 
+from ingest_watcher.domain.event_buffer import InMemoryEventBuffer, SnapshotEventBuffer
 from ingest_watcher.domain.events import SnapshotEvent, SnapshotEventType
+from ingest_watcher.domain.paths import intern_directory, normalize_path
 from ingest_watcher.domain.snapshot_state import SnapshotState
 
 
@@ -10,6 +15,16 @@ class SnapshotEntryStats(BaseModel):
     md5: str = Field(..., min_length=1, description="MD5 hash of the file")
     size: int = Field(..., ge=0, description="File size in bytes")
     mime: str = Field(default="", description="MIME type of the file")
+    device: int | None = Field(
+        default=None, description="Device of the file inode, unknown when None"
+    )
+    inode: int | None = Field(
+        default=None, description="Inode number of the file, unknown when None"
+    )
+    mtime_ns: int | None = Field(
+        default=None,
+        description="Modification time in nanoseconds when hashed, unknown when None",
+    )
 
     model_config = {"frozen": True}
 
@@ -24,8 +39,19 @@ class SnapshotEntryStats(BaseModel):
             raise ValueError("MD5 hash must contain only hexadecimal characters")
         return v.lower()
 
+    @property
+    def file_id(self) -> tuple[int, int] | None:
+        """Get the (device, inode) pair shared by all hard links to the file."""
+        if self.device is None or self.inode is None:
+            return None
+        return self.device, self.inode
+
     def __eq__(self, other: object) -> bool:
-        """Check if two SnapshotEntryStats are equal."""
+        """Check if two SnapshotEntryStats are equal.
+
+        Only the content is compared, hard links to the same content are
+        equal whatever their inode and modification time.
+        """
         if not isinstance(other, SnapshotEntryStats):
             return False
         return (
@@ -34,48 +60,111 @@ class SnapshotEntryStats(BaseModel):
             and self.mime == other.mime
         )
 
+    def __hash__(self) -> int:
+        """Hash the fields compared by `__eq__`."""
+        return hash((self.md5, self.size, self.mime))
+
 
 class Snapshot:
     """Entity representing a snapshot of a directory."""
 
-    def __init__(self, id: str, state_store: SnapshotState):
+    def __init__(
+        self,
+        id: str,
+        state_store: SnapshotState,
+        event_buffer: SnapshotEventBuffer | None = None,
+    ):
         self._id: str = id
         self._state_store = state_store
-        self._events: list[SnapshotEvent] = []
+        self._events: SnapshotEventBuffer = (
+            event_buffer if event_buffer is not None else InMemoryEventBuffer()
+        )
+
+    @property
+    def id(self) -> str:
+        """Get the id of the snapshot."""
+        return self._id
+
+    @property
+    def root_path(self) -> str:
+        """Get the root path of the snapshot."""
+        return self._state_store.root_path
+
+    def exists(self, path: str) -> bool:
+        """Check if a path exists in the snapshot."""
+        return self._state_store.exists(path)
+
+    def get_stats(self, path: str) -> SnapshotEntryStats | None:
+        """Get the stats of a file in the snapshot."""
+        return self._state_store.get_stats(path)
+
+    def get_children(self, path: str) -> list[str]:
+        """Get the children of a path in the snapshot."""
+        return self._state_store.get_children(path)
+
+    def get_all_files(self, root_path: str | None = None) -> list[str]:
+        """Get all files in the snapshot."""
+        return self._state_store.get_all_files(root_path)
+
+    def get_links(self, path: str) -> list[str]:
+        """Get the files that are hard links to the same inode as a file.
+
+        The file itself is included, a file of unknown inode is its own only
+        link and a path that is not a file has none.
+        """
+        stats = self._state_store.get_stats(path)
+        if stats is None:
+            return []
+        file_id = stats.file_id
+        if file_id is None:
+            return [path]
+        return self._state_store.get_links(*file_id)
+
+    def get_inode_links(self, device: int, inode: int) -> list[str]:
+        """Get the files of the snapshot that are hard links to an inode."""
+        return self._state_store.get_links(device, inode)
+
+    def _emit(self, event: SnapshotEvent) -> None:
+        self._events.append(event)
 
     def add_file(self, path: str, stats: SnapshotEntryStats):
         """Add an entry to the snapshot."""
 
+        path = normalize_path(path)
         changed = self._state_store.add_file(path, stats)
         if changed:
-            self._events.append(
+            self._emit(
                 SnapshotEvent(event_type=SnapshotEventType.FILE_ADDED, path=path)
             )
 
     def remove_file(self, path: str):
         """Remove a file from the snapshot."""
 
+        path = normalize_path(path)
         changed = self._state_store.remove_file(path)
         if changed:
-            self._events.append(
+            self._emit(
                 SnapshotEvent(event_type=SnapshotEventType.FILE_REMOVED, path=path)
             )
 
     def update_file(self, path: str, stats: SnapshotEntryStats):
         """Update a file in the snapshot."""
 
+        path = normalize_path(path)
         changed = self._state_store.update_file(path, stats)
         if changed:
-            self._events.append(
+            self._emit(
                 SnapshotEvent(event_type=SnapshotEventType.FILE_MODIFIED, path=path)
             )
 
     def add_directory(self, path: str):
         """Add a directory to the snapshot."""
 
+        # the event shares the string the state keeps for the directory
+        path = intern_directory(normalize_path(path))
         changed = self._state_store.add_directory(path)
         if changed:
-            self._events.append(
+            self._emit(
                 SnapshotEvent(event_type=SnapshotEventType.DIRECTORY_ADDED, path=path)
             )
 
@@ -85,19 +174,32 @@ class Snapshot:
         removed_files = self._state_store.remove_directory(path)
         if len(removed_files) > 0:
             for removed_file in removed_files:
-                self._events.append(
+                self._emit(
                     SnapshotEvent(
                         event_type=SnapshotEventType.FILE_REMOVED, path=removed_file
                     )
                 )
 
+    @property
+    def pending_events(self) -> int:
+        """Get the number of events not pulled yet."""
+        return len(self._events)
+
     def pull_events(self) -> list[SnapshotEvent]:
         """Pull events from the snapshot."""
+        return list(self._events.drain())
+
+    def pull_event_batches(
+        self, batch_size: int = 1000
+    ) -> Iterator[list[SnapshotEvent]]:
+        """Pull events from the snapshot in batches of at most `batch_size`.
 
-        events = self._events
-        self._events = []
+        The pending events are detached when this is called, the batches are
+        then streamed from the buffer without materializing all of them.
+        """
+        events = self._events.drain()
 
-        return events
+        return (list(batch) for batch in batched(events, batch_size))
 
     # @classmethod
     # def from_entries(self, entries: list[SnapshotEntry]) -> Snapshot:
@@ -0,0 +1,46 @@
+from collections.abc import Iterator
+from typing import Protocol
+
+from ingest_watcher.domain.events import SnapshotEvent
+
+
+class SnapshotEventBuffer(Protocol):
+    """Keeps the events of a snapshot until they are pulled."""
+
+    def append(self, event: SnapshotEvent) -> None:
+        """Append an event to the buffer."""
+        ...
+
+    def __len__(self) -> int:
+        """Get the number of buffered events."""
+        ...
+
+    def drain(self) -> Iterator[SnapshotEvent]:
+        """Detach the buffered events and iterate over them in order.
+
+        The buffer is empty once this returns, events appended while the
+        iterator is consumed are kept for the next drain.
+        """
+        ...
+
+
+class InMemoryEventBuffer:
+    """Unbounded event buffer backed by a list."""
+
+    def __init__(self) -> None:
+        self._events: list[SnapshotEvent] = []
+
+    def append(self, event: SnapshotEvent) -> None:
+        """Append an event to the buffer."""
+        self._events.append(event)
+
+    def __len__(self) -> int:
+        """Get the number of buffered events."""
+        return len(self._events)
+
+    def drain(self) -> Iterator[SnapshotEvent]:
+        """Detach the buffered events and iterate over them in order."""
+        events = self._events
+        self._events = []
+
+        return iter(events)
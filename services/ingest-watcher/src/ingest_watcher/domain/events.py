@@ -7,13 +7,15 @@ class SnapshotEventType(Enum):
     FILE_ADDED = "file_added"
     FILE_REMOVED = "file_removed"
     FILE_MODIFIED = "file_modified"
+    DIRECTORY_ADDED = "directory_added"
 
 
 class SnapshotEvent(BaseModel):
     """Domain event representing a change in a snapshot."""
 
     event_type: SnapshotEventType = Field(
-        ..., description="Event type: FILE_ADDED, FILE_REMOVED, or FILE_MODIFIED"
+        ...,
+        description="Event type: FILE_ADDED, FILE_REMOVED, FILE_MODIFIED or DIRECTORY_ADDED",
     )
     path: str = Field(..., description="Path of the file that changed", min_length=1)
 
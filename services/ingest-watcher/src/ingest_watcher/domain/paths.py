@@ -0,0 +1,71 @@
+"""Normalization and containment of absolute POSIX paths with str operations.
+
+Normalizing matches `str(PurePosixPath(path))` without building one:
+repeated separators and `.` segments are dropped. Paths with `..` segments
+are rejected, resolving them needs the file system and without that
+`/media/../etc` would pass as within `/media`. Directory paths are
+interned, so the entries of a snapshot, its events and the watcher share
+one string object per directory.
+"""
+
+import sys
+from functools import lru_cache
+
+NORMALIZE_CACHE_SIZE = 64 * 1024
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_path(path: str) -> str:
+    """Normalize an absolute path.
+
+    Raises ValueError for a relative path or one with `..` segments.
+    """
+    if not path.startswith("/"):
+        raise ValueError(f"Path must be absolute, got {path}")
+
+    # most paths come from the file system already normalized
+    if "//" not in path and "/." not in path and (path == "/" or path[-1] != "/"):
+        return path
+
+    segments = [s for s in path.split("/") if s and s != "."]
+    if ".." in segments:
+        raise ValueError(f"Path must not have '..' segments, got {path}")
+    # POSIX leaves the meaning of exactly two leading slashes to the system
+    prefix = "//" if path.startswith("//") and not path.startswith("///") else "/"
+
+    return prefix + "/".join(segments)
+
+
+def is_within(path: str, root: str) -> bool:
+    """Check if a normalized path is a root, or below it, by whole segments."""
+    if not path.startswith(root):
+        return False
+    return len(path) == len(root) or root.endswith("/") or path[len(root)] == "/"
+
+
+def intern_directory(path: str) -> str:
+    """Get the shared string object of a normalized directory path."""
+    return sys.intern(path)
+
+
+def parent_path(path: str) -> str:
+    """Get the interned parent directory of a normalized path."""
+    return sys.intern(path.rsplit("/", 1)[0] or "/")
+
+
+def subtree_path(path: str, root: str, depth: int = 1) -> str | None:
+    """Get the interned entry `depth` levels below a root a normalized path is in.
+
+    Returns None for the root and the paths fewer than `depth` levels below
+    it, the path must be within the root.
+    """
+    if len(path) == len(root):
+        return None
+
+    end = len(root) - 1 if root.endswith("/") else len(root)
+    for _ in range(depth):
+        if end == -1:
+            return None
+        end = path.find("/", end + 1)
+
+    return sys.intern(path if end == -1 else path[:end])
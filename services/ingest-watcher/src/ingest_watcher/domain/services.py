@@ -1,4 +1,5 @@
-from collections.abc import Callable
+from collections.abc import Callable, Iterable
+from typing import Protocol, runtime_checkable
 
 from ingest_watcher.domain.entities import Snapshot
 from ingest_watcher.domain.events import SnapshotEvent, SnapshotEventType
@@ -8,24 +9,33 @@ def diff_snapshots(old: Snapshot, new: Snapshot) -> list[SnapshotEvent]:
     """Compare two snapshots and return the differences."""
     events: list[SnapshotEvent] = []
 
+    old_files = old.get_all_files()
+    new_files = new.get_all_files()
+    old_paths = set(old_files)
+    new_paths = set(new_files)
+
     # Find added files
-    for path in new.files:
-        if path not in old.files:
+    for path in new_files:
+        if path not in old_paths:
             events.append(
                 SnapshotEvent(event_type=SnapshotEventType.FILE_ADDED, path=path)
             )
 
     # Find removed files
-    for path in old.files:
-        if path not in new.files:
+    for path in old_files:
+        if path not in new_paths:
             events.append(
                 SnapshotEvent(event_type=SnapshotEventType.FILE_REMOVED, path=path)
             )
 
     # Find modified files (same path but different md5)
-    for path in new.files:
-        if path in old.files:
-            if new.files[path].md5 != old.files[path].md5:
+    for path in new_files:
+        if path in old_paths:
+            old_stats = old.get_stats(path)
+            new_stats = new.get_stats(path)
+            if old_stats is None or new_stats is None:
+                continue
+            if new_stats.md5 != old_stats.md5:
                 events.append(
                     SnapshotEvent(event_type=SnapshotEventType.FILE_MODIFIED, path=path)
                 )
@@ -33,15 +43,32 @@ def diff_snapshots(old: Snapshot, new: Snapshot) -> list[SnapshotEvent]:
     return events
 
 
+@runtime_checkable
+class BufferedEventProcessor(Protocol):
+    """Event processor holding events back to handle them in bulk."""
+
+    def __call__(self, event: SnapshotEvent) -> None: ...
+
+    def flush(self) -> None:
+        """Handle every event held back so far."""
+        ...
+
+
 def dummy_event_processor(event: SnapshotEvent) -> None:
     """Dummy event processor that prints the event."""
     print(event)
 
 
 def process_snapshot_events(
-    events: list[SnapshotEvent],
+    events: Iterable[SnapshotEvent],
     processor: Callable[[SnapshotEvent], None] = dummy_event_processor,
 ) -> None:
-    """Process snapshot events."""
+    """Process snapshot events.
+
+    A buffered processor is flushed once every event was handed to it, so
+    the events are handled when this returns.
+    """
     for event in events:
         processor(event)
+    if isinstance(processor, BufferedEventProcessor):
+        processor.flush()
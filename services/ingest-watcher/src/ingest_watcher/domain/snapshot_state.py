@@ -9,6 +9,11 @@ if TYPE_CHECKING:
 class SnapshotState(Protocol):
     """ It abstracts away state keeping logic from snapshot it self"""
 
+    @property
+    def root_path(self) -> str:
+        """Get the normalized root path of the snapshot."""
+        ...
+
     def add_file(self, path: str, stats: SnapshotEntryStats) -> bool:
         """Add a file to the snapshot."""
         ...
@@ -44,3 +49,15 @@ class SnapshotState(Protocol):
     def get_all_files(self, root_path: str | None = None) -> list[str]:
         """Get all files in the snapshot."""
         ...
+
+    def get_links(self, device: int, inode: int) -> list[str]:
+        """Get the files of the snapshot that are hard links to an inode."""
+        ...
+
+    def entry_count(self) -> int:
+        """Get the number of files and directories below the root."""
+        ...
+
+    def tombstone_count(self) -> int:
+        """Get the number of removed entries still holding memory."""
+        ...
@@ -0,0 +1,351 @@
+import os
+import struct
+import threading
+import zlib
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import BinaryIO
+
+from ingest_watcher.domain.events import SnapshotEvent, SnapshotEventType
+
+# Record layout: <payload length:u32><crc32 of payload:u32><payload>, the
+# payload is <event type code:u8><utf-8 path>. Codes are part of the on-disk
+# format, never renumber them.
+RECORD_HEADER = struct.Struct("<II")
+
+EVENT_TYPE_CODES: dict[SnapshotEventType, int] = {
+    SnapshotEventType.FILE_ADDED: 1,
+    SnapshotEventType.FILE_REMOVED: 2,
+    SnapshotEventType.FILE_MODIFIED: 3,
+    SnapshotEventType.DIRECTORY_ADDED: 4,
+}
+EVENT_TYPES_BY_CODE = {code: t for t, code in EVENT_TYPE_CODES.items()}
+
+SEGMENT_SUFFIX = ".log"
+DEFAULT_SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+WRITE_BUFFER_BYTES = 256 * 1024
+
+
+def encode_record(event: SnapshotEvent) -> bytes:
+    """Encode an event as a length-prefixed, checksummed record."""
+    payload = bytes((EVENT_TYPE_CODES[event.event_type],)) + event.path.encode(
+        "utf-8", "surrogateescape"
+    )
+    return RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def decode_payload(payload: bytes) -> SnapshotEvent:
+    """Decode the payload of a record into an event."""
+    return SnapshotEvent(
+        event_type=EVENT_TYPES_BY_CODE[payload[0]],
+        path=payload[1:].decode("utf-8", "surrogateescape"),
+    )
+
+
+def read_record(f: BinaryIO) -> bytes | None:
+    """Read the payload of the next record, None at the end or on a torn record."""
+    header = f.read(RECORD_HEADER.size)
+    if len(header) < RECORD_HEADER.size:
+        return None
+
+    length, crc = RECORD_HEADER.unpack(header)
+    payload = f.read(length)
+    if len(payload) < length or zlib.crc32(payload) != crc:
+        return None
+
+    return payload
+
+
+def iter_records(data: bytes) -> Iterator[SnapshotEvent]:
+    """Decode consecutive records from a buffer."""
+    view = memoryview(data)
+    pos = 0
+    while pos < len(view):
+        length, crc = RECORD_HEADER.unpack_from(view, pos)
+        pos += RECORD_HEADER.size
+        payload = bytes(view[pos : pos + length])
+        if zlib.crc32(payload) != crc:
+            raise ValueError(f"Corrupted record at byte {pos - RECORD_HEADER.size}")
+        pos += length
+        yield decode_payload(payload)
+
+
+def _fsync_directory(directory: Path) -> None:
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class EventJournal:
+    """Durable append-only journal of snapshot events.
+
+    Events are stored in segment files named after the offset of their first
+    record. Appends are buffered; `sync` makes them durable with group commit:
+    concurrent callers share a single fsync instead of issuing one each.
+    """
+
+    def __init__(
+        self, directory: Path, segment_max_bytes: int = DEFAULT_SEGMENT_MAX_BYTES
+    ) -> None:
+        self._directory = directory
+        self._segment_max_bytes = segment_max_bytes
+
+        # guards the buffer, the offsets and the active segment
+        self._lock = threading.Lock()
+        # held by the thread leading a group commit
+        self._sync_lock = threading.Lock()
+
+        self._pending = bytearray()
+        # last read positions: offset -> (segment base offset, byte position)
+        self._positions: dict[int, tuple[int, int]] = {}
+
+        self._directory.mkdir(parents=True, exist_ok=True)
+        bases = self.segment_bases()
+        if not bases:
+            bases = [0]
+
+        self._segment_base = bases[-1]
+        self._segment_size, records = self._recover_segment(self._segment_base)
+        self._next_offset = self._segment_base + records
+        self._file = open(self._segment_path(self._segment_base), "ab", buffering=0)
+        os.fsync(self._file.fileno())
+        _fsync_directory(self._directory)
+        self._durable_offset = self._next_offset
+
+    @property
+    def directory(self) -> Path:
+        return self._directory
+
+    @property
+    def next_offset(self) -> int:
+        """Offset the next appended event will get."""
+        return self._next_offset
+
+    @property
+    def durable_offset(self) -> int:
+        """Every record below this offset has been fsynced."""
+        return self._durable_offset
+
+    def segment_bases(self) -> list[int]:
+        """Get the base offsets of the segments on disk, in order."""
+        return sorted(
+            int(p.stem) for p in self._directory.glob(f"*{SEGMENT_SUFFIX}")
+        )
+
+    def _segment_path(self, base: int) -> Path:
+        return self._directory / f"{base:020d}{SEGMENT_SUFFIX}"
+
+    def _recover_segment(self, base: int) -> tuple[int, int]:
+        """Truncate a torn tail off a segment, return its size and record count."""
+        path = self._segment_path(base)
+        if not path.exists():
+            return 0, 0
+
+        records = 0
+        valid_size = 0
+        with open(path, "rb") as f:
+            while read_record(f) is not None:
+                records += 1
+                valid_size = f.tell()
+
+        if valid_size < path.stat().st_size:
+            os.truncate(path, valid_size)
+
+        return valid_size, records
+
+    def append(self, event: SnapshotEvent) -> int:
+        """Append an event, return its offset. Call `sync` to make it durable."""
+        return self.append_batch((event,)) - 1
+
+    def append_batch(self, events: Iterable[SnapshotEvent]) -> int:
+        """Append events, return the offset following the last one."""
+        with self._lock:
+            for event in events:
+                self._pending += encode_record(event)
+                self._next_offset += 1
+                if self._segment_size + len(self._pending) >= self._segment_max_bytes:
+                    self._rotate()
+                elif len(self._pending) >= WRITE_BUFFER_BYTES:
+                    self._write_pending()
+
+            return self._next_offset
+
+    def _write_pending(self) -> None:
+        if self._pending:
+            self._file.write(self._pending)
+            self._segment_size += len(self._pending)
+            self._pending.clear()
+
+    def _rotate(self) -> None:
+        """Seal the active segment and start a new one."""
+        self._write_pending()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self._durable_offset = self._next_offset
+
+        self._segment_base = self._next_offset
+        self._segment_size = 0
+        self._file = open(self._segment_path(self._segment_base), "ab", buffering=0)
+        _fsync_directory(self._directory)
+
+    def sync(self, offset: int | None = None) -> None:
+        """Block until every record below `offset` (default: all) is durable."""
+        with self._lock:
+            target = self._next_offset if offset is None else offset
+            if self._durable_offset >= target:
+                return
+
+        with self._sync_lock:
+            with self._lock:
+                # a previous leader may have committed our records already
+                if self._durable_offset >= target:
+                    return
+                self._write_pending()
+                committed = self._next_offset
+                # fsync a duplicate so appends and rotation can proceed meanwhile
+                fd = os.dup(self._file.fileno())
+
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+            with self._lock:
+                self._durable_offset = max(self._durable_offset, committed)
+
+    def read(self, offset: int = 0) -> Iterator[tuple[int, SnapshotEvent]]:
+        """Iterate over the events from `offset` up to the current end.
+
+        The records up to the end are synced first: a crash could otherwise
+        lose records already consumed, and new events would reuse their
+        offsets.
+        """
+        with self._lock:
+            end = self._next_offset
+        self.sync(end)
+
+        if offset >= end:
+            return
+
+        start = self._positions.pop(offset, None)
+        if start is None:
+            bases = [b for b in self.segment_bases() if b <= offset]
+            if not bases:
+                raise ValueError(f"Offset {offset} was removed from the journal")
+            start = (bases[-1], 0)
+
+        segment_base, position = start
+        current = offset if position else segment_base
+        resume: tuple[int, int, int] | None = None
+        bases = [b for b in self.segment_bases() if b >= segment_base]
+        try:
+            for i, base in enumerate(bases):
+                next_base = bases[i + 1] if i + 1 < len(bases) else end
+                with open(self._segment_path(base), "rb") as f:
+                    f.seek(position)
+                    while current < min(next_base, end):
+                        payload = read_record(f)
+                        if payload is None:
+                            raise ValueError(f"Corrupted record at offset {current}")
+                        current += 1
+                        if current > offset:
+                            resume = (current, base, f.tell())
+                            yield current - 1, decode_payload(payload)
+                if current >= end:
+                    return
+                position = 0
+        finally:
+            # remembered so the next read from where this one stopped does
+            # not have to rescan the segment
+            if resume is not None:
+                self._positions = {resume[0]: (resume[1], resume[2])}
+
+    def remove_segments_before(self, offset: int) -> int:
+        """Delete sealed segments holding only records below `offset`."""
+        with self._lock:
+            bases = self.segment_bases()
+            removed = 0
+            for base, next_base in zip(bases, bases[1:]):
+                if next_base > offset or base == self._segment_base:
+                    break
+                self._segment_path(base).unlink()
+                removed += 1
+            # keep the read position cache unless it may point to a removed
+            # segment, this runs after every processing of events
+            if removed:
+                self._positions = {}
+
+        return removed
+
+    def close(self) -> None:
+        """Make every record durable and close the active segment."""
+        self.sync()
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self) -> "EventJournal":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+class JournalConsumer:
+    """Named reader of a journal that resumes from its last committed offset."""
+
+    def __init__(self, journal: EventJournal, name: str) -> None:
+        self._journal = journal
+        self._offset_path = journal.directory / "consumers" / f"{name}.offset"
+        self._committed_offset = self._load_offset()
+        self._position = self._committed_offset
+
+    @property
+    def committed_offset(self) -> int:
+        """Offset of the first event not yet committed as processed."""
+        return self._committed_offset
+
+    @property
+    def position(self) -> int:
+        """Offset of the next event `poll` returns."""
+        return self._position
+
+    def _load_offset(self) -> int:
+        try:
+            return int(self._offset_path.read_text(encoding="ascii"))
+        except FileNotFoundError:
+            return 0
+
+    def poll(self, max_records: int = 1000) -> list[tuple[int, SnapshotEvent]]:
+        """Get up to `max_records` events following the last polled one."""
+        records: list[tuple[int, SnapshotEvent]] = []
+        for record in self._journal.read(self._position):
+            records.append(record)
+            if len(records) >= max_records:
+                break
+
+        if records:
+            self._position = records[-1][0] + 1
+        return records
+
+    def rewind(self) -> None:
+        """Go back to the last committed offset to replay uncommitted events."""
+        self._position = self._committed_offset
+
+    def commit(self, offset: int | None = None) -> None:
+        """Durably record that every event below `offset` (default: polled) is done."""
+        offset = self._position if offset is None else offset
+        if offset == self._committed_offset:
+            return
+
+        self._offset_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._offset_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="ascii") as f:
+            f.write(str(offset))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._offset_path)
+        _fsync_directory(self._offset_path.parent)
+
+        self._committed_offset = offset
@@ -0,0 +1,227 @@
+import hashlib
+import logging
+import mimetypes
+import os
+import time
+
+from ingest_watcher.domain.entities import Snapshot, SnapshotEntryStats
+from ingest_watcher.domain.paths import intern_directory
+from ingest_watcher.infrastructure.scan_checkpoint import ScanCheckpoint
+from ingest_watcher.infrastructure.scan_progress import (
+    ScanProgress,
+    ScanProgressReporter,
+)
+from ingest_watcher.metrics import REGISTRY
+from ingest_watcher.profiling import (
+    PHASE_HASH,
+    PHASE_SCAN,
+    PHASE_STATE_MUTATION,
+    phase,
+)
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# digest of an inode by (device, inode, size, modification time)
+LinkDigests = dict[tuple[int, int, int, int], str]
+
+HASHED_BYTES = REGISTRY.counter(
+    "ingest_watcher_hashed_bytes_total", "Bytes read to compute file hashes."
+)
+HASHED_FILES = REGISTRY.counter("ingest_watcher_hashed_files_total", "Files hashed.")
+HASH_SECONDS = REGISTRY.histogram(
+    "ingest_watcher_hash_seconds",
+    "Time spent hashing a single file.",
+    buckets=(0.001, 0.01, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0),
+)
+HASH_REUSED_FILES = REGISTRY.counter(
+    "ingest_watcher_hash_reused_files_total",
+    "Files not hashed because another hard link to them already was.",
+)
+SCANNED_ENTRIES = REGISTRY.counter(
+    "ingest_watcher_scanned_entries_total", "Files and directories scanned."
+)
+SCAN_SECONDS = REGISTRY.histogram(
+    "ingest_watcher_scan_seconds",
+    "Duration of complete directory tree scans.",
+    buckets=(1.0, 10.0, 60.0, 300.0, 900.0, 3600.0, 4 * 3600.0, 12 * 3600.0),
+)
+
+
+def compute_md5(path: str, chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    """Compute the MD5 hash of a file."""
+    start = time.perf_counter()
+    digest = hashlib.md5()
+    size = 0
+    with phase(PHASE_HASH), open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+            size += len(chunk)
+
+    HASHED_BYTES.inc(size)
+    HASHED_FILES.inc()
+    HASH_SECONDS.observe(time.perf_counter() - start)
+
+    return digest.hexdigest()
+
+
+def guess_mime(path: str) -> str:
+    """Guess the MIME type of a file from its name, empty when unknown."""
+    mime, _ = mimetypes.guess_type(path, strict=False)
+    return mime or ""
+
+
+def _link_digest(snapshot: Snapshot, st: os.stat_result) -> str | None:
+    """Get the digest of a hard link in the snapshot unchanged since hashed."""
+    for link in snapshot.get_inode_links(st.st_dev, st.st_ino):
+        stats = snapshot.get_stats(link)
+        if (
+            stats is not None
+            and stats.size == st.st_size
+            and stats.mtime_ns == st.st_mtime_ns
+        ):
+            return stats.md5
+    return None
+
+
+def compute_stats(
+    path: str, digests: LinkDigests | None = None, snapshot: Snapshot | None = None
+) -> SnapshotEntryStats:
+    """Compute the snapshot stats of a file.
+
+    Files with several hard links are hashed once per inode, size and
+    modification time when the same `digests` is passed for all of them,
+    or when another link is already in `snapshot`.
+    """
+    st = os.stat(path)
+    key = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+    md5 = None
+    if st.st_nlink > 1:
+        if digests is not None:
+            md5 = digests.get(key)
+        if md5 is None and snapshot is not None:
+            md5 = _link_digest(snapshot, st)
+    if md5 is None:
+        md5 = compute_md5(path)
+    else:
+        HASH_REUSED_FILES.inc()
+    if digests is not None and st.st_nlink > 1:
+        digests[key] = md5
+
+    return SnapshotEntryStats(
+        md5=md5,
+        size=st.st_size,
+        mime=guess_mime(path),
+        device=st.st_dev,
+        inode=st.st_ino,
+        mtime_ns=st.st_mtime_ns,
+    )
+
+
+def _scan_directory(
+    dir_path: str,
+    snapshot: Snapshot,
+    checkpoint: ScanCheckpoint | None,
+    progress: ScanProgress | None,
+    reporter: ScanProgressReporter | None,
+    digests: LinkDigests,
+) -> list[str] | None:
+    """Add the entries of one directory, return its sub directories."""
+    try:
+        with os.scandir(dir_path) as it:
+            entries = sorted(it, key=lambda e: e.name)
+    except OSError as e:
+        logger.warning("Cannot list directory %s: %s", dir_path, e)
+        return None
+
+    SCANNED_ENTRIES.inc(len(entries))
+    sub_dirs: list[str] = []
+    for entry in entries:
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                path = intern_directory(entry.path)
+                with phase(PHASE_STATE_MUTATION):
+                    snapshot.add_directory(path)
+                sub_dirs.append(path)
+                if progress is not None:
+                    progress.add_directory()
+            elif entry.is_file(follow_symlinks=False):
+                # restored from a checkpoint, no need to hash it again
+                if snapshot.exists(entry.path):
+                    continue
+                # links of files restored from a checkpoint are in the snapshot
+                stats = compute_stats(entry.path, digests, snapshot)
+                with phase(PHASE_STATE_MUTATION):
+                    snapshot.add_file(entry.path, stats)
+                if checkpoint is not None:
+                    checkpoint.record_file(entry.path, stats)
+                if progress is not None:
+                    progress.add_file(stats.size)
+                # a single flat directory can hold a large share of the tree
+                if checkpoint is not None:
+                    checkpoint.maybe_commit()
+                if reporter is not None and progress is not None:
+                    reporter.report(progress)
+        except OSError as e:
+            logger.warning("Cannot scan %s: %s", entry.path, e)
+
+    if checkpoint is not None:
+        checkpoint.record_directory(dir_path, sub_dirs)
+
+    return sub_dirs
+
+
+def scan_tree(
+    root_path: str,
+    snapshot: Snapshot,
+    checkpoint: ScanCheckpoint | None = None,
+    progress: ScanProgress | None = None,
+    reporter: ScanProgressReporter | None = None,
+) -> None:
+    """Walk a directory tree and add every directory and file to the snapshot.
+
+    With a checkpoint, directories it marks as completed are not listed
+    again and the scan progress is committed to it periodically.
+    """
+    with phase(PHASE_SCAN):
+        _scan_tree(root_path, snapshot, checkpoint, progress, reporter)
+
+
+def _scan_tree(
+    root_path: str,
+    snapshot: Snapshot,
+    checkpoint: ScanCheckpoint | None,
+    progress: ScanProgress | None,
+    reporter: ScanProgressReporter | None,
+) -> None:
+    start = time.perf_counter()
+    completed = checkpoint.completed_directories if checkpoint is not None else {}
+    # digests of files with several hard links, for the other links
+    digests: LinkDigests = {}
+
+    stack = [root_path]
+    while stack:
+        dir_path = stack.pop()
+        sub_dirs = completed.get(dir_path)
+        if sub_dirs is None:
+            sub_dirs = _scan_directory(
+                dir_path, snapshot, checkpoint, progress, reporter, digests
+            )
+            if sub_dirs is None:
+                continue
+
+        # reversed so directories are visited in name order
+        stack.extend(reversed(sub_dirs))
+
+        if checkpoint is not None:
+            checkpoint.maybe_commit()
+        if reporter is not None and progress is not None:
+            reporter.report(progress)
+
+    if checkpoint is not None:
+        checkpoint.commit()
+    SCAN_SECONDS.observe(time.perf_counter() - start)
+    if reporter is not None and progress is not None:
+        progress.finished = True
+        reporter.report(progress, force=True)
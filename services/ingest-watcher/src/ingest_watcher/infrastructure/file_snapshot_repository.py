@@ -0,0 +1,65 @@
+import json
+import os
+from collections.abc import Callable
+from pathlib import Path
+
+from ingest_watcher.domain.entities import Snapshot, SnapshotEntryStats
+from ingest_watcher.domain.snapshot_state import SnapshotState
+
+SnapshotStateFactory = Callable[[str], SnapshotState]
+
+
+class FileSnapshotRepository:
+    """Snapshot repository storing each snapshot as a JSON lines manifest.
+
+    The first line is a header holding the snapshot id and root path, every
+    following line holds one file with its stats.
+    """
+
+    def __init__(self, directory: Path, state_factory: SnapshotStateFactory) -> None:
+        self._directory = directory
+        self._state_factory = state_factory
+
+    def path_for(self, snapshot_id: str) -> Path:
+        """Get the manifest path of a snapshot id."""
+        return self._directory / f"{snapshot_id}.jsonl"
+
+    def load(self, path: Path) -> Snapshot:
+        """Load a snapshot from a manifest file."""
+        with open(path, encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            snapshot = Snapshot(
+                id=header["id"], state_store=self._state_factory(header["root_path"])
+            )
+            for line in f:
+                record = json.loads(line)
+                snapshot.add_file(
+                    record.pop("path"), SnapshotEntryStats.model_validate(record)
+                )
+
+        # loading is not a change, drop the events generated while rebuilding
+        snapshot.pull_events()
+
+        return snapshot
+
+    def save(self, snapshot: Snapshot) -> None:
+        """Save a snapshot to its manifest file."""
+        self._directory.mkdir(parents=True, exist_ok=True)
+        path = self.path_for(snapshot.id)
+        tmp_path = path.with_suffix(".tmp")
+
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"id": snapshot.id, "root_path": snapshot.root_path}))
+            f.write("\n")
+            for file_path in snapshot.get_all_files():
+                stats = snapshot.get_stats(file_path)
+                if stats is None:
+                    continue
+                # the inode is left out where unknown
+                record = {"path": file_path, **stats.model_dump(exclude_none=True)}
+                f.write(json.dumps(record))
+                f.write("\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(tmp_path, path)
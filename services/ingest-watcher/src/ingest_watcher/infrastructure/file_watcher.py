@@ -1,8 +1,112 @@
-from pathlib import Path
+import logging
+import os
+from collections.abc import Callable
+
+from watchdog.events import FileSystemEvent, FileSystemEventHandler
+from watchdog.observers import Observer
+from watchdog.observers.api import BaseObserver
+
 from ingest_watcher.domain.entities import Snapshot
-from ingest_watcher.domain.repositories import Watcher
+from ingest_watcher.domain.paths import normalize_path
+from ingest_watcher.infrastructure.file_scanner import (
+    compute_stats,
+    guess_mime,
+    scan_tree,
+)
+from ingest_watcher.profiling import PHASE_STATE_MUTATION, phase
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotEventHandler(FileSystemEventHandler):
+    """Apply file system events to a snapshot.
+
+    An error applying an event would end the observer thread unnoticed, it
+    is kept in `error` for the thread watching the observer instead.
+    """
+
+    def __init__(self, snapshot: Snapshot, on_change: Callable[[], None]) -> None:
+        self._snapshot = snapshot
+        self._on_change = on_change
+        self.error: Exception | None = None
+
+    def dispatch(self, event: FileSystemEvent) -> None:
+        try:
+            super().dispatch(event)
+        except Exception as e:
+            logger.exception("Cannot apply %s", event)
+            if self.error is None:
+                self.error = e
+
+    def on_created(self, event: FileSystemEvent) -> None:
+        path = normalize_path(os.fsdecode(event.src_path))
+        if event.is_directory:
+            with phase(PHASE_STATE_MUTATION):
+                self._snapshot.add_directory(path)
+            scan_tree(path, self._snapshot)
+        else:
+            self._add_or_update(path)
+        self._on_change()
+
+    def on_modified(self, event: FileSystemEvent) -> None:
+        if event.is_directory:
+            return
+        self._add_or_update(normalize_path(os.fsdecode(event.src_path)))
+        self._on_change()
+
+    def on_deleted(self, event: FileSystemEvent) -> None:
+        path = normalize_path(os.fsdecode(event.src_path))
+        with phase(PHASE_STATE_MUTATION):
+            if event.is_directory:
+                self._snapshot.remove_directory(path)
+            else:
+                self._snapshot.remove_file(path)
+        self._on_change()
+
+    def on_moved(self, event: FileSystemEvent) -> None:
+        src_path = normalize_path(os.fsdecode(event.src_path))
+        dest_path = normalize_path(os.fsdecode(event.dest_path))
+        if event.is_directory:
+            with phase(PHASE_STATE_MUTATION):
+                self._snapshot.remove_directory(src_path)
+                self._snapshot.add_directory(dest_path)
+            scan_tree(dest_path, self._snapshot)
+        else:
+            with phase(PHASE_STATE_MUTATION):
+                self._snapshot.remove_file(src_path)
+            self._add_or_update(dest_path)
+        self._on_change()
+
+    def _add_or_update(self, path: str) -> None:
+        try:
+            stats = compute_stats(path, snapshot=self._snapshot)
+        except OSError as e:
+            # the file may be gone again before we get to hash it
+            logger.warning("Cannot stat %s: %s", path, e)
+            return
+
+        with phase(PHASE_STATE_MUTATION):
+            if not self._snapshot.exists(path):
+                self._snapshot.add_file(path, stats)
+                return
+
+            self._snapshot.update_file(path, stats)
+            # hard links share their content, writing through one changes all
+            for link in self._snapshot.get_links(path):
+                if link != path:
+                    self._snapshot.update_file(
+                        link, stats.model_copy(update={"mime": guess_mime(link)})
+                    )
+
+
+def start_file_watcher(
+    root_path: str, snapshot: Snapshot, on_change: Callable[[], None]
+) -> tuple[BaseObserver, SnapshotEventHandler]:
+    """Start watching a path and apply its changes to the snapshot."""
 
-def file_watcher(path: Path) -> Snapshot:
-    """Watch a path and return a snapshot on its change.."""
+    handler = SnapshotEventHandler(snapshot, on_change)
+    observer = Observer()
+    observer.schedule(handler, root_path, recursive=True)
+    observer.start()
 
-    return Snapshot(root=path, files={})
\ No newline at end of file
+    return observer, handler
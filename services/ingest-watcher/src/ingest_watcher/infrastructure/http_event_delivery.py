@@ -0,0 +1,293 @@
+import http.client
+import json
+import logging
+import random
+import threading
+import time
+from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from ingest_watcher.domain.events import SnapshotEvent
+from ingest_watcher.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# statuses worth another attempt, any other non 2xx status is final
+RETRYABLE_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+DELIVERED_EVENTS = REGISTRY.counter(
+    "ingest_watcher_delivered_events_total", "Events delivered to the ingest API."
+)
+DELIVERY_REQUESTS = REGISTRY.counter(
+    "ingest_watcher_delivery_requests_total",
+    "Requests sent to the ingest API.",
+    ["outcome"],
+)
+DELIVERY_SECONDS = REGISTRY.histogram(
+    "ingest_watcher_delivery_seconds",
+    "Time spent delivering a batch of events, retries included.",
+)
+_REQUESTS_BY_OUTCOME = {
+    outcome: DELIVERY_REQUESTS.labels(outcome)
+    for outcome in ("success", "retry", "failure")
+}
+
+
+class DeliveryError(Exception):
+    """Raised when a batch of events could not be delivered."""
+
+
+class HttpConnectionPool:
+    """Keep-alive HTTP connections to a single host, reused most recent first."""
+
+    def __init__(self, url: str, timeout: float = 10.0) -> None:
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"URL must be an absolute http(s) URL, got {url}")
+
+        self._connection_class = (
+            http.client.HTTPSConnection
+            if parts.scheme == "https"
+            else http.client.HTTPConnection
+        )
+        self._host = parts.hostname
+        self._port = parts.port
+        self._timeout = timeout
+        self.path = parts.path or "/"
+        if parts.query:
+            self.path += f"?{parts.query}"
+
+        self._lock = threading.Lock()
+        self._idle: list[http.client.HTTPConnection] = []
+
+    @contextmanager
+    def connection(self) -> Iterator[http.client.HTTPConnection]:
+        """Borrow a connection, it is dropped if the block raises."""
+        with self._lock:
+            connection = self._idle.pop() if self._idle else None
+        if connection is None:
+            connection = self._connection_class(
+                self._host, self._port, timeout=self._timeout
+            )
+
+        try:
+            yield connection
+        except BaseException:
+            connection.close()
+            raise
+        with self._lock:
+            self._idle.append(connection)
+
+    def close(self) -> None:
+        """Close the idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+
+class HttpEventDelivery:
+    """Event processor POSTing batches of events to an ingest endpoint.
+
+    Events are sent as a JSON body once `batch_size` of them are pending,
+    once the oldest waited `batch_interval` seconds, or on `flush`. At most
+    `max_connections` batches are in flight, each on a pooled keep-alive
+    connection. A batch sharing paths with an earlier one is only sent once
+    that one was delivered, so the events of a path arrive in order. Failed
+    requests are retried up to `max_retries` times after a jittered
+    exponential backoff.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        batch_size: int = 500,
+        batch_interval: float = 1.0,
+        max_connections: int = 4,
+        max_retries: int = 5,
+        backoff_base: float = 0.2,
+        backoff_max: float = 10.0,
+        timeout: float = 10.0,
+    ) -> None:
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be at least 1, got {batch_size}")
+        if batch_interval <= 0:
+            raise ValueError(f"batch_interval must be positive, got {batch_interval}")
+        if max_connections < 1:
+            raise ValueError(
+                f"max_connections must be at least 1, got {max_connections}"
+            )
+
+        self._pool = HttpConnectionPool(url, timeout)
+        self._batch_size = batch_size
+        self._batch_interval = batch_interval
+        self._max_retries = max_retries
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+
+        self._executor = ThreadPoolExecutor(
+            max_connections, thread_name_prefix="event-delivery"
+        )
+        # batches queued or in flight, producers wait beyond that
+        self._slots = threading.BoundedSemaphore(2 * max_connections)
+        self._lock = threading.Lock()
+        self._pending: list[SnapshotEvent] = []
+        self._pending_since = 0.0
+        self._futures: set[Future[None]] = set()
+        # paths of the batches queued or in flight
+        self._in_flight: dict[Future[None], frozenset[str]] = {}
+
+        self._closed = threading.Event()
+        self._linger = threading.Thread(
+            target=self._send_lingering, name="event-delivery-linger", daemon=True
+        )
+        self._linger.start()
+
+    def __call__(self, event: SnapshotEvent) -> None:
+        with self._lock:
+            if not self._pending:
+                self._pending_since = time.monotonic()
+            self._pending.append(event)
+            full = len(self._pending) >= self._batch_size
+        if full:
+            self._submit_pending(self._batch_size)
+
+    def _submit_pending(self, min_size: int = 1) -> None:
+        """Submit the pending events as a batch if there are at least `min_size`.
+
+        The batch is taken and registered as in flight under the lock, so a
+        concurrent `flush` waits for it, and batches are queued in the order
+        their events were taken.
+        """
+        # producers wait here for a free slot, before taking the lock
+        self._slots.acquire()
+        with self._lock:
+            if len(self._pending) < min_size:
+                self._slots.release()
+                return
+            batch, self._pending = self._pending, []
+            paths = frozenset(event.path for event in batch)
+            earlier = [
+                future
+                for future, in_flight in self._in_flight.items()
+                if not paths.isdisjoint(in_flight)
+            ]
+            future = self._executor.submit(self._deliver, batch, earlier)
+            self._in_flight[future] = paths
+            self._futures.add(future)
+        future.add_done_callback(self._on_done)
+
+    def _on_done(self, future: Future[None]) -> None:
+        self._slots.release()
+        with self._lock:
+            del self._in_flight[future]
+            # failed batches are kept for the next flush to report
+            if future.exception() is None:
+                self._futures.discard(future)
+
+    def _send_lingering(self) -> None:
+        """Send pending events that waited longer than the batch interval."""
+        while not self._closed.wait(self._batch_interval / 2):
+            with self._lock:
+                lingered = (
+                    bool(self._pending)
+                    and time.monotonic() - self._pending_since >= self._batch_interval
+                )
+            if lingered:
+                self._submit_pending()
+
+    def _backoff(self, attempt: int) -> float:
+        """Get a full jitter delay before retrying after `attempt` failures."""
+        return random.uniform(
+            0, min(self._backoff_max, self._backoff_base * 2**attempt)
+        )
+
+    def _post(self, body: bytes) -> int:
+        """Send a request and return its status, raises on connection errors."""
+        with self._pool.connection() as connection:
+            connection.request(
+                "POST",
+                self._pool.path,
+                body=body,
+                headers={"Content-Type": "application/json"},
+            )
+            response = connection.getresponse()
+            # the response must be consumed before the connection is reused
+            response.read()
+            if response.will_close:
+                connection.close()
+            return response.status
+
+    def _deliver(
+        self, batch: list[SnapshotEvent], earlier: list[Future[None]]
+    ) -> None:
+        # earlier batches were queued first, so they already run or are done
+        wait(earlier)
+        if any(future.exception() is not None for future in earlier):
+            raise DeliveryError(
+                f"Not delivering {len(batch)} events after an earlier batch "
+                "with the same paths failed"
+            )
+
+        start = time.perf_counter()
+        body = json.dumps(
+            {
+                "events": [
+                    {"event_type": event.event_type.value, "path": event.path}
+                    for event in batch
+                ]
+            }
+        ).encode()
+
+        for attempt in range(self._max_retries + 1):
+            try:
+                status = self._post(body)
+            except (OSError, http.client.HTTPException) as e:
+                error: BaseException = e
+            else:
+                if 200 <= status < 300:
+                    _REQUESTS_BY_OUTCOME["success"].inc()
+                    DELIVERED_EVENTS.inc(len(batch))
+                    DELIVERY_SECONDS.observe(time.perf_counter() - start)
+                    return
+                error = DeliveryError(f"Ingest API responded with {status}")
+                if status not in RETRYABLE_STATUSES:
+                    break
+
+            if attempt < self._max_retries:
+                _REQUESTS_BY_OUTCOME["retry"].inc()
+                delay = self._backoff(attempt)
+                logger.warning("Delivery failed: %s, retrying in %.2fs", error, delay)
+                time.sleep(delay)
+
+        _REQUESTS_BY_OUTCOME["failure"].inc()
+        raise DeliveryError(f"Failed to deliver {len(batch)} events") from error
+
+    def flush(self) -> None:
+        """Send the pending events and wait until every batch is delivered.
+
+        Raises DeliveryError if a batch sent since the last flush failed.
+        """
+        self._submit_pending()
+
+        with self._lock:
+            futures = list(self._futures)
+        wait(futures)
+
+        with self._lock:
+            self._futures.difference_update(futures)
+        errors = [e for e in map(Future.exception, futures) if e is not None]
+        if errors:
+            raise DeliveryError(f"{len(errors)} batches failed") from errors[0]
+
+    def close(self) -> None:
+        """Deliver the pending events and release the connections."""
+        try:
+            self.flush()
+        finally:
+            self._closed.set()
+            self._linger.join()
+            self._executor.shutdown()
+            self._pool.close()
@@ -1,5 +1,10 @@
 from ingest_watcher.domain.entities import SnapshotEntryStats
-from pathlib import PurePosixPath
+from ingest_watcher.domain.paths import (
+    intern_directory,
+    is_within,
+    normalize_path,
+    parent_path,
+)
 
 
 class InMemoryTreeSnapshotState:
@@ -12,10 +17,19 @@ class InMemoryTreeSnapshotState:
         self._stats: list[SnapshotEntryStats | None] = []
         self._children: dict[int, list[int]] = {}
         self._path_to_id: dict[str, int] = {}
+        # files of each (device, inode), in insertion order
+        self._links: dict[tuple[int, int], dict[int, None]] = {}
 
-        self._root_path = self._normalize_path(root_path, check_in_root=False)
+        self._root_path = intern_directory(
+            self._normalize_path(root_path, check_in_root=False)
+        )
         self._add_entry(self._root_path, True, None)
 
+    @property
+    def root_path(self) -> str:
+        """Get the normalized root path of the snapshot."""
+        return self._root_path
+
     def _add_entry(
         self, path: str, is_dir: bool, stats: SnapshotEntryStats | None
     ) -> int:
@@ -29,12 +43,28 @@ class InMemoryTreeSnapshotState:
 
         return idx
 
+    def _link(self, idx: int) -> None:
+        """Index a file by its inode."""
+        stats = self._stats[idx]
+        file_id = stats.file_id if stats is not None else None
+        if file_id is not None:
+            self._links.setdefault(file_id, {})[idx] = None
+
+    def _unlink(self, idx: int) -> None:
+        """Drop a file from the inode index."""
+        stats = self._stats[idx]
+        file_id = stats.file_id if stats is not None else None
+        if file_id is None:
+            return
+        links = self._links[file_id]
+        del links[idx]
+        if not links:
+            del self._links[file_id]
+
     def _add_parents(self, path: str) -> int:
         """Add parents of an entry to the snapshot."""
 
-        parent = path.rsplit("/", 1)[0]
-
-        return self._add_missing_parents(parent)
+        return self._add_missing_parents(parent_path(path))
 
     def _add_missing_parents(self, path: str) -> int:
         """Add missing parents of a path to the snapshot."""
@@ -43,8 +73,7 @@ class InMemoryTreeSnapshotState:
         if idx is not None:
             return idx
 
-        parent = path.rsplit("/", 1)[0] or "/"
-        parent_idx = self._add_missing_parents(parent)
+        parent_idx = self._add_missing_parents(parent_path(path))
 
         idx = self._add_entry(path, True, None)
         self._children[parent_idx].append(idx)
@@ -53,14 +82,11 @@ class InMemoryTreeSnapshotState:
 
     def _normalize_path(self, path: str, check_in_root: bool = True) -> str:
         """Normalize a path."""
-        p = PurePosixPath(path)
-        if not p.is_absolute():
-            raise ValueError(f"Path must be absolute, got {path}")
-
-        if check_in_root and not str(p).startswith(self._root_path):
+        p = normalize_path(path)
+        if check_in_root and not is_within(p, self._root_path):
             raise ValueError(f"Path must be in root, got {path}")
 
-        return str(p)
+        return p
 
     def exists(self, path: str) -> bool:
         """Check if a path exists in the snapshot."""
@@ -75,6 +101,7 @@ class InMemoryTreeSnapshotState:
         parent_idx = self._add_parents(p)
         idx = self._add_entry(p, False, stats)
         self._children[parent_idx].append(idx)
+        self._link(idx)
 
         return True
 
@@ -94,6 +121,7 @@ class InMemoryTreeSnapshotState:
         if idx is None:
             return False
 
+        self._unlink(idx)
         self._paths[idx] = None
         self._is_dir[idx] = None
         self._stats[idx] = None
@@ -111,11 +139,20 @@ class InMemoryTreeSnapshotState:
             return False
 
         old_stats = self._stats[idx]
-        if old_stats == stats:
-            return False
-
-        self._stats[idx] = stats
-        return True
+        changed = old_stats != stats
+        if (
+            changed
+            or old_stats is None
+            or old_stats.file_id != stats.file_id
+            or old_stats.mtime_ns != stats.mtime_ns
+        ):
+            # the inode and modification time are kept current even though
+            # they are not a change
+            self._unlink(idx)
+            self._stats[idx] = stats
+            self._link(idx)
+
+        return changed
 
     def add_directory(self, path: str) -> bool:
         """Add a directory to the snapshot."""
@@ -124,7 +161,7 @@ class InMemoryTreeSnapshotState:
             return False
 
         parent_idx = self._add_parents(p)
-        idx = self._add_entry(p, True, None)
+        idx = self._add_entry(intern_directory(p), True, None)
         self._children[parent_idx].append(idx)
 
         return True
@@ -144,6 +181,7 @@ class InMemoryTreeSnapshotState:
             else:
                 removed_files.append(child_path)
             
+            self._unlink(child_idx)
             self._paths[child_idx] = None
             self._is_dir[child_idx] = None
             self._stats[child_idx] = None
@@ -161,6 +199,7 @@ class InMemoryTreeSnapshotState:
             return list[str]()
 
         removed_files = self._remove_children(idx)
+        self._unlink(idx)
         self._paths[idx] = None
         self._is_dir[idx] = None
         self._stats[idx] = None
@@ -203,3 +242,17 @@ class InMemoryTreeSnapshotState:
                 children_path.append(child_path)
 
         return children_path
+
+    def get_links(self, device: int, inode: int) -> list[str]:
+        """Get the files of the snapshot that are hard links to an inode."""
+        links = self._links.get((device, inode), {})
+        return [path for i in links if (path := self._paths[i]) is not None]
+
+    def entry_count(self) -> int:
+        """Get the number of files and directories below the root."""
+        # the root itself is in the index unless it was removed
+        return len(self._path_to_id) - (self._root_path in self._path_to_id)
+
+    def tombstone_count(self) -> int:
+        """Get the number of removed entries still holding memory."""
+        return len(self._paths) - len(self._path_to_id)
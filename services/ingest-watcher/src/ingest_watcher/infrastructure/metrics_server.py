@@ -0,0 +1,65 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ingest_watcher.metrics import REGISTRY, MetricsRegistry
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricsServer(ThreadingHTTPServer):
+    """HTTP server exposing a metrics registry on /metrics."""
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], registry: MetricsRegistry) -> None:
+        super().__init__(address, _MetricsHandler)
+        self.registry = registry
+        self._thread: threading.Thread | None = None
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def start(self) -> None:
+        """Serve requests from a background thread."""
+        self._thread = threading.Thread(
+            target=self.serve_forever, name="metrics-server", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop serving and release the socket."""
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    server: MetricsServer
+
+    def do_GET(self) -> None:
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+
+        body = self.server.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:
+        # scrapes every few seconds would flood the logs
+        pass
+
+
+def start_metrics_server(
+    host: str, port: int, registry: MetricsRegistry = REGISTRY
+) -> MetricsServer:
+    """Start serving the registry in the background, port 0 picks a free one."""
+    server = MetricsServer((host, port), registry)
+    server.start()
+
+    return server
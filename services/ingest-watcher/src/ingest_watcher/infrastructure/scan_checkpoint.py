@@ -0,0 +1,124 @@
+import json
+import os
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from ingest_watcher.domain.entities import Snapshot, SnapshotEntryStats
+from ingest_watcher.infrastructure.scan_progress import ScanProgress
+
+
+class ScanCheckpoint:
+    """Append-only log of scan progress a restarted scan can resume from.
+
+    Each scanned file is logged with its stats and each directory is logged
+    once all its files are in the snapshot, together with its sub directories.
+    Records are buffered and only written on `commit`, after `before_commit`
+    ran, so the log never gets ahead of the events handed to processors.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        interval: float = 30.0,
+        before_commit: Callable[[], None] | None = None,
+    ) -> None:
+        self._path = path
+        self._interval = interval
+        self._before_commit = before_commit
+        self._pending: list[str] = []
+        self._last_commit = time.monotonic()
+        # directory -> its sub directories, for directories fully scanned
+        self._completed: dict[str, list[str]] = {}
+
+    @property
+    def completed_directories(self) -> dict[str, list[str]]:
+        """Get the fully scanned directories mapped to their sub directories."""
+        return self._completed
+
+    def restore(
+        self, snapshot: Snapshot, progress: ScanProgress | None = None
+    ) -> int:
+        """Load the logged entries into the snapshot, return the files restored.
+
+        Restore into a fresh snapshot: the restored entries were handed to
+        processors before being logged, so the events generated while
+        restoring them are dropped.
+        """
+        self._completed = {}
+        restored = 0
+        if not self._path.exists():
+            return restored
+
+        valid_size = 0
+        with open(self._path, "rb") as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("Line is not terminated")
+                    record = json.loads(line)
+                except ValueError:
+                    # torn tail of a crashed run, cut so appends stay readable
+                    break
+                valid_size += len(line)
+
+                if "dir" in record:
+                    self._completed[record["dir"]] = record["subdirs"]
+                    for sub_dir in record["subdirs"]:
+                        snapshot.add_directory(sub_dir)
+                    if progress is not None:
+                        progress.add_directory()
+                    continue
+
+                path = record.pop("path")
+                stats = SnapshotEntryStats.model_validate(record)
+                snapshot.add_file(path, stats)
+                if progress is not None:
+                    progress.add_file(stats.size, hashed=False)
+                restored += 1
+
+        if valid_size < self._path.stat().st_size:
+            os.truncate(self._path, valid_size)
+
+        for _ in snapshot.pull_event_batches():
+            pass
+
+        return restored
+
+    def record_file(self, path: str, stats: SnapshotEntryStats) -> None:
+        """Log a file added to the snapshot."""
+        self._pending.append(
+            json.dumps({"path": path, **stats.model_dump(exclude_none=True)})
+        )
+
+    def record_directory(self, path: str, sub_dirs: list[str]) -> None:
+        """Log a directory whose files are all in the snapshot."""
+        self._completed[path] = sub_dirs
+        self._pending.append(json.dumps({"dir": path, "subdirs": sub_dirs}))
+
+    def maybe_commit(self) -> None:
+        """Commit if the checkpoint interval has elapsed."""
+        if time.monotonic() - self._last_commit >= self._interval:
+            self.commit()
+
+    def commit(self) -> None:
+        """Durably append the buffered records to the log."""
+        if self._before_commit is not None:
+            self._before_commit()
+
+        if self._pending:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self._path, "a", encoding="utf-8") as f:
+                f.write("\n".join(self._pending))
+                f.write("\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._pending.clear()
+
+        self._last_commit = time.monotonic()
+
+    def clear(self) -> None:
+        """Remove the log once the scan is complete."""
+        self._pending.clear()
+        self._completed = {}
+        self._path.unlink(missing_ok=True)
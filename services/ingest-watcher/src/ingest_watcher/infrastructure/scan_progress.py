@@ -0,0 +1,106 @@
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+
+@dataclass
+class ScanProgress:
+    """Progress of a directory scan."""
+
+    root_path: str
+    entries_done: int = 0
+    files_done: int = 0
+    # includes the bytes of files restored from a checkpoint
+    bytes_done: int = 0
+    # bytes hashed by this run only, used for the hash rate
+    bytes_hashed: int = 0
+    # estimate of the bytes under the root, None when unknown
+    bytes_total: int | None = None
+    started_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    finished: bool = False
+
+    def add_file(self, size: int, hashed: bool = True) -> None:
+        """Count a scanned file."""
+        self.entries_done += 1
+        self.files_done += 1
+        self.bytes_done += size
+        if hashed:
+            self.bytes_hashed += size
+
+    def add_directory(self) -> None:
+        """Count a scanned directory."""
+        self.entries_done += 1
+
+    @property
+    def hash_rate(self) -> float:
+        """Get the bytes hashed per second."""
+        elapsed = self.updated_at - self.started_at
+        if elapsed <= 0:
+            return 0.0
+        return self.bytes_hashed / elapsed
+
+    @property
+    def eta_seconds(self) -> float | None:
+        """Estimate the remaining seconds from the hash rate, None when unknown."""
+        if self.finished:
+            return 0.0
+        if self.bytes_total is None or self.hash_rate <= 0:
+            return None
+        return max(self.bytes_total - self.bytes_done, 0) / self.hash_rate
+
+    def to_dict(self) -> dict[str, object]:
+        """Convert the progress to a JSON serializable dict."""
+        return asdict(self) | {
+            "hash_rate": self.hash_rate,
+            "eta_seconds": self.eta_seconds,
+        }
+
+    @classmethod
+    def read(cls, path: Path) -> "ScanProgress":
+        """Read a progress file written by `ScanProgressReporter`."""
+        data = json.loads(path.read_text(encoding="utf-8"))
+        data.pop("hash_rate", None)
+        data.pop("eta_seconds", None)
+        return cls(**data)
+
+
+def estimate_total_bytes(root_path: str, progress_path: Path) -> int | None:
+    """Estimate the bytes under a root from the progress of its last scan.
+
+    The used space of the file system is no estimate for a root that is a
+    sub directory or shares its volume, so without a finished scan of the
+    same root the total, and with it the ETA, stays unknown.
+    """
+    try:
+        previous = ScanProgress.read(progress_path)
+    except (OSError, ValueError, TypeError):
+        return None
+    if previous.root_path != root_path:
+        return None
+    # an interrupted scan carries the estimate of the scan finished before it
+    return previous.bytes_done if previous.finished else previous.bytes_total
+
+
+class ScanProgressReporter:
+    """Periodically write scan progress to a JSON file other processes can read."""
+
+    def __init__(self, path: Path, interval: float = 5.0) -> None:
+        self._path = path
+        self._interval = interval
+        self._last_write = 0.0
+
+    def report(self, progress: ScanProgress, force: bool = False) -> None:
+        """Write the progress if the interval has elapsed or `force` is set."""
+        now = time.monotonic()
+        if not force and now - self._last_write < self._interval:
+            return
+        self._last_write = now
+
+        progress.updated_at = time.time()
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(progress.to_dict()), encoding="utf-8")
+        os.replace(tmp_path, self._path)
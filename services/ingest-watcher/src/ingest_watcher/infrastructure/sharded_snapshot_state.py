@@ -0,0 +1,402 @@
+import threading
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+from typing import Literal
+
+from ingest_watcher.domain.entities import SnapshotEntryStats
+from ingest_watcher.domain.paths import (
+    intern_directory,
+    is_within,
+    normalize_path,
+    parent_path,
+    subtree_path,
+)
+from ingest_watcher.domain.snapshot_state import SnapshotState
+from ingest_watcher.infrastructure.in_memory_tree_snapshot_state import (
+    InMemoryTreeSnapshotState,
+)
+
+SnapshotStateFactory = Callable[[str], SnapshotState]
+
+StateOperationKind = Literal[
+    "add_file", "remove_file", "update_file", "add_directory", "remove_directory"
+]
+
+
+class ReadWriteLock:
+    """Lock shared by any number of readers or held by a single writer.
+
+    Waiting writers block new readers so a steady stream of readers cannot
+    starve them.
+    """
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    def acquire_read(self) -> None:
+        with self._cond:
+            while self._writer or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self) -> None:
+        with self._cond:
+            self._readers -= 1
+            if self._readers == 0:
+                self._cond.notify_all()
+
+    def acquire_write(self) -> None:
+        with self._cond:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+
+    def release_write(self) -> None:
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+@dataclass(frozen=True, slots=True)
+class StateOperation:
+    """A single mutation applied as part of a batch."""
+
+    kind: StateOperationKind
+    path: str
+    stats: SnapshotEntryStats | None = None
+
+
+class ShardedSnapshotState:
+    """Thread-safe snapshot state sharding the tree by subtree.
+
+    Each entry `shard_depth` levels below the root, with everything under it,
+    lives in one of `shards` inner states picked by hashing its path. The
+    directories above that level form a spine kept by the sharded state
+    itself, while files above it are sharded by their own path. Every shard
+    has its own readers-writer lock, so readers never block each other and
+    writers only block work on the same shard.
+
+    Layouts with only a few top-level directories, like movies, music and
+    photos, need a depth of 2 or more to spread over the shards.
+    """
+
+    def __init__(
+        self,
+        root_path: str,
+        shards: int = 16,
+        state_factory: SnapshotStateFactory = InMemoryTreeSnapshotState,
+        shard_depth: int = 1,
+    ) -> None:
+        if shards < 1:
+            raise ValueError(f"shards must be at least 1, got {shards}")
+        if shard_depth < 1:
+            raise ValueError(f"shard_depth must be at least 1, got {shard_depth}")
+
+        self._shards = [state_factory(root_path) for _ in range(shards)]
+        self._locks = [ReadWriteLock() for _ in range(shards)]
+        self._root_path = self._shards[0].root_path
+        self._shard_depth = shard_depth
+
+        # directories above the shard depth -> their children in insertion
+        # order, to list them the way a single state would
+        self._spine: dict[str, dict[str, None]] = {self._root_path: {}}
+        self._spine_lock = ReadWriteLock()
+
+    @property
+    def root_path(self) -> str:
+        """Get the normalized root path of the snapshot."""
+        return self._root_path
+
+    def _shard_index(self, path: str) -> int:
+        return hash(path) % len(self._shards)
+
+    def _route(self, path: str) -> tuple[str, str | None, int]:
+        """Get the normalized path, the subtree it is in and its shard.
+
+        The subtree is None above the shard depth, where the path is sharded
+        by itself.
+        """
+        normalized = normalize_path(path)
+        if not is_within(normalized, self._root_path):
+            raise ValueError(f"Path must be in root, got {path}")
+
+        subtree = subtree_path(normalized, self._root_path, self._shard_depth)
+        return normalized, subtree, self._shard_index(subtree or normalized)
+
+    def _shards_of(self, operation: StateOperation) -> Iterable[int]:
+        """Get the shards an operation has to hold the write locks of."""
+        _, subtree, shard = self._route(operation.path)
+        if subtree is None and operation.kind == "remove_directory":
+            # a spine directory has entries in any shard
+            return range(len(self._shards))
+        return (shard,)
+
+    def _spine_children(self, path: str) -> list[str]:
+        with self._spine_lock.read():
+            return list(self._spine.get(path, ()))
+
+    def _subtrees(self, path: str) -> list[str]:
+        """Get the subtrees and files below a spine directory, in order."""
+
+        def walk(directory: str) -> Iterator[str]:
+            for child in self._spine.get(directory, ()):
+                if child in self._spine:
+                    yield from walk(child)
+                else:
+                    yield child
+
+        with self._spine_lock.read():
+            return list(walk(path))
+
+    def _register(self, path: str) -> None:
+        """Add an entry to the spine with any of its missing parents."""
+        with self._spine_lock.write():
+            while path != self._root_path:
+                parent = parent_path(path)
+                siblings = self._spine.setdefault(parent, {})
+                if path in siblings:
+                    break
+                siblings[path] = None
+                path = parent
+            self._spine.setdefault(self._root_path, {})
+
+    def _track(self, path: str, shard: int) -> None:
+        """Sync the spine with a shard, called holding its write lock."""
+        exists = self._shards[shard].exists(path)
+        # only writers of this shard change the membership of its entries,
+        # so the spine lock is only taken when it actually changes
+        if exists == (path in self._spine.get(parent_path(path), ())):
+            return
+
+        if exists:
+            self._register(path)
+            return
+        with self._spine_lock.write():
+            del self._spine[parent_path(path)][path]
+
+    def _files_of_subtree(self, subtree: str, shard: int) -> list[str]:
+        """Get all files of a subtree, called holding a shard lock."""
+        state = self._shards[shard]
+        if not state.exists(subtree):
+            return []
+        if state.get_stats(subtree) is not None:
+            return [subtree]
+        return state.get_all_files(subtree)
+
+    @contextmanager
+    def _read_locked(self, shards: Iterable[int]) -> Iterator[None]:
+        """Hold the read locks of shards, always taken in index order."""
+        with ExitStack() as stack:
+            for shard in sorted(set(shards)):
+                stack.enter_context(self._locks[shard].read())
+            yield
+
+    @contextmanager
+    def _write_locked(self, shards: Iterable[int]) -> Iterator[None]:
+        """Hold the write locks of shards, always taken in index order."""
+        with ExitStack() as stack:
+            for shard in sorted(set(shards)):
+                stack.enter_context(self._locks[shard].write())
+            yield
+
+    def _apply(self, operation: StateOperation) -> bool | list[str]:
+        """Apply an operation, called holding the needed write locks."""
+        path, subtree, shard = self._route(operation.path)
+        if subtree is None:
+            if operation.kind == "add_directory":
+                return self._add_spine_directory(path, shard)
+            if path in self._spine:
+                if operation.kind == "remove_directory":
+                    return self._remove_spine_directory(path)
+                # spine directories are not files
+                return False
+            if path == self._root_path:
+                return False
+
+        state = self._shards[shard]
+        result: bool | list[str]
+        match operation.kind:
+            case "add_file":
+                assert operation.stats is not None
+                result = state.add_file(path, operation.stats)
+            case "update_file":
+                assert operation.stats is not None
+                result = state.update_file(path, operation.stats)
+            case "remove_file":
+                result = state.remove_file(path)
+            case "add_directory":
+                result = state.add_directory(path)
+            case "remove_directory":
+                result = state.remove_directory(path)
+
+        self._track(subtree or path, shard)
+        return result
+
+    def _add_spine_directory(self, path: str, shard: int) -> bool:
+        """Add a directory above the shard depth, called holding its shard lock."""
+        if path in self._spine or self._shards[shard].exists(path):
+            return False
+
+        self._register(path)
+        with self._spine_lock.write():
+            self._spine[intern_directory(path)] = {}
+        return True
+
+    def _remove_spine_directory(self, path: str) -> list[str]:
+        """Remove a directory above the shard depth, called holding all locks."""
+        removed_files: list[str] = []
+        for subtree in self._subtrees(path):
+            removed_files.extend(
+                self._files_of_subtree(subtree, self._shard_index(subtree))
+            )
+        for state in self._shards:
+            state.remove_directory(path)
+
+        with self._spine_lock.write():
+            for directory in [d for d in self._spine if is_within(d, path)]:
+                del self._spine[directory]
+            if path != self._root_path:
+                del self._spine[parent_path(path)][path]
+
+        return removed_files
+
+    def apply_batch(self, operations: list[StateOperation]) -> list[bool | list[str]]:
+        """Apply operations atomically, readers see all of them or none.
+
+        Readers spanning shards hold the read locks of all of them, so this
+        holds for batches touching several subtrees too. Returns the result
+        each operation's method would have returned.
+        """
+        shards: set[int] = set()
+        for operation in operations:
+            shards.update(self._shards_of(operation))
+
+        with self._write_locked(shards):
+            return [self._apply(operation) for operation in operations]
+
+    def _mutate(self, operation: StateOperation) -> bool | list[str]:
+        with self._write_locked(self._shards_of(operation)):
+            return self._apply(operation)
+
+    def add_file(self, path: str, stats: SnapshotEntryStats) -> bool:
+        """Add a file to the snapshot."""
+        return bool(self._mutate(StateOperation("add_file", path, stats)))
+
+    def remove_file(self, path: str) -> bool:
+        """Remove a file from the snapshot."""
+        return bool(self._mutate(StateOperation("remove_file", path)))
+
+    def update_file(self, path: str, stats: SnapshotEntryStats) -> bool:
+        """Update a file in the snapshot."""
+        return bool(self._mutate(StateOperation("update_file", path, stats)))
+
+    def add_directory(self, path: str) -> bool:
+        """Add a directory to the snapshot."""
+        return bool(self._mutate(StateOperation("add_directory", path)))
+
+    def remove_directory(self, path: str) -> list[str]:
+        """Remove a directory from the snapshot."""
+        result = self._mutate(StateOperation("remove_directory", path))
+        return result if isinstance(result, list) else []
+
+    def get_stats(self, path: str) -> SnapshotEntryStats | None:
+        """Get the stats of a file in the snapshot."""
+        path, _, shard = self._route(path)
+        with self._locks[shard].read():
+            return self._shards[shard].get_stats(path)
+
+    def exists(self, path: str) -> bool:
+        """Check if a path exists in the snapshot."""
+        path, subtree, shard = self._route(path)
+        if subtree is None and path in self._spine:
+            return True
+        with self._locks[shard].read():
+            return self._shards[shard].exists(path)
+
+    def get_children(self, path: str) -> list[str]:
+        """Get the children of a path in the snapshot."""
+        path, subtree, shard = self._route(path)
+        if subtree is None and path in self._spine:
+            # children above the shard depth are sharded by their own path
+            with self._read_locked(range(len(self._shards))):
+                return [
+                    c
+                    for c in self._spine_children(path)
+                    if c in self._spine
+                    or self._shards[self._shard_index(c)].exists(c)
+                ]
+
+        with self._locks[shard].read():
+            return self._shards[shard].get_children(path)
+
+    def get_all_files(self, root_path: str | None = None) -> list[str]:
+        """Get all files in the snapshot."""
+        path = self._root_path
+        if root_path is not None:
+            path, subtree, shard = self._route(root_path)
+            if subtree is not None or path not in self._spine:
+                with self._locks[shard].read():
+                    return self._shards[shard].get_all_files(root_path)
+
+        # writers only change the spine holding a shard lock, so it stays as
+        # is while every shard is read
+        files: list[str] = []
+        with self._read_locked(range(len(self._shards))):
+            for subtree in self._subtrees(path):
+                files.extend(
+                    self._files_of_subtree(subtree, self._shard_index(subtree))
+                )
+
+        return files
+
+    def shard_entry_counts(self) -> list[int]:
+        """Get the number of entries of each shard, to see how they spread."""
+        return [state.entry_count() for state in self._shards]
+
+    def get_links(self, device: int, inode: int) -> list[str]:
+        """Get the files of the snapshot that are hard links to an inode."""
+        # links can be anywhere in the tree, so every shard is asked
+        links: list[str] = []
+        with self._read_locked(range(len(self._shards))):
+            for state in self._shards:
+                links.extend(state.get_links(device, inode))
+
+        return links
+
+    def entry_count(self) -> int:
+        """Get the number of files and directories below the root."""
+        with self._spine_lock.read():
+            directories = [d for d in self._spine if d != self._root_path]
+        # shards also hold the spine directories above their own entries
+        copies = sum(
+            state.exists(directory)
+            for state in self._shards
+            for directory in directories
+        )
+        return sum(self.shard_entry_counts()) - copies + len(directories)
+
+    def tombstone_count(self) -> int:
+        """Get the number of removed entries still holding memory."""
+        return sum(state.tombstone_count() for state in self._shards)
@@ -0,0 +1,80 @@
+import tempfile
+from collections.abc import Iterator
+from typing import BinaryIO
+
+from ingest_watcher.domain.events import SnapshotEvent
+from ingest_watcher.infrastructure.event_journal import (
+    decode_payload,
+    encode_record,
+    read_record,
+)
+
+SPILL_BUFFER_BYTES = 1024 * 1024
+
+
+class SpillingEventBuffer:
+    """Event buffer keeping at most `max_in_memory` events in memory.
+
+    Once the cap is reached, every following event is appended to an
+    anonymous temporary file in the journal record format until the buffer
+    is drained, so the order of events is kept across memory and disk.
+    """
+
+    def __init__(self, max_in_memory: int, spill_dir: str | None = None) -> None:
+        if max_in_memory < 0:
+            raise ValueError(
+                f"max_in_memory must not be negative, got {max_in_memory}"
+            )
+
+        self._max_in_memory = max_in_memory
+        self._spill_dir = spill_dir
+        self._events: list[SnapshotEvent] = []
+        self._spill: BinaryIO | None = None
+        self._spilled = 0
+
+    @property
+    def spilled(self) -> int:
+        """Get the number of buffered events kept on disk."""
+        return self._spilled
+
+    def append(self, event: SnapshotEvent) -> None:
+        """Append an event, spilling it to disk when the memory cap is reached."""
+        if self._spill is None and len(self._events) < self._max_in_memory:
+            self._events.append(event)
+            return
+
+        if self._spill is None:
+            self._spill = tempfile.TemporaryFile(
+                dir=self._spill_dir, buffering=SPILL_BUFFER_BYTES
+            )
+        self._spill.write(encode_record(event))
+        self._spilled += 1
+
+    def __len__(self) -> int:
+        """Get the number of buffered events."""
+        return len(self._events) + self._spilled
+
+    def drain(self) -> Iterator[SnapshotEvent]:
+        """Detach the buffered events and iterate over them in order."""
+        events, spill, spilled = self._events, self._spill, self._spilled
+        self._events = []
+        self._spill = None
+        self._spilled = 0
+
+        return self._iter_events(events, spill, spilled)
+
+    @staticmethod
+    def _iter_events(
+        events: list[SnapshotEvent], spill: BinaryIO | None, spilled: int
+    ) -> Iterator[SnapshotEvent]:
+        yield from events
+        if spill is None:
+            return
+
+        with spill:
+            spill.seek(0)
+            for _ in range(spilled):
+                payload = read_record(spill)
+                if payload is None:
+                    raise ValueError("Spilled events are truncated")
+                yield decode_payload(payload)
@@ -0,0 +1,286 @@
+"""Lightweight counters, gauges and histograms rendered as Prometheus text.
+
+Metrics are created once at import time on the process wide `REGISTRY`, hot
+paths should bind labelled children up front with `labels()` so recording a
+value is a lock and an addition.
+"""
+
+import abc
+import bisect
+import math
+import threading
+import time
+from collections.abc import Callable, Iterator, Sequence
+from contextlib import AbstractContextManager, contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return f"{{{pairs}}}"
+
+
+class _Metric[ChildT](abc.ABC):
+    """Base of metrics holding one child per combination of label values."""
+
+    type_name = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: dict[tuple[str, ...], ChildT] = {}
+
+    @abc.abstractmethod
+    def _new_child(self) -> ChildT:
+        """Create the child of a new combination of label values."""
+
+    def labels(self, *values: str) -> ChildT:
+        """Get the child of the given label values."""
+        if len(values) != len(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {self.labelnames}, got {values}"
+            )
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _default(self) -> ChildT:
+        if self.labelnames:
+            raise ValueError(f"{self.name} has labels, use labels() first")
+        return self.labels()
+
+    @abc.abstractmethod
+    def _samples(self) -> Iterator[tuple[str, str, float]]:
+        """Yield (name suffix, formatted labels, value) of every sample."""
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {_escape(self.help)}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        for suffix, labels, value in self._samples():
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class CounterChild:
+    __slots__ = ("_lock", "_value")
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        """Increase the counter by a non negative amount."""
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+class Counter(_Metric[CounterChild]):
+    """Monotonically increasing value."""
+
+    type_name = "counter"
+
+    def _new_child(self) -> CounterChild:
+        return CounterChild()
+
+    def inc(self, amount: float = 1) -> None:
+        self._default().inc(amount)
+
+    def _samples(self) -> Iterator[tuple[str, str, float]]:
+        for values, child in list(self._children.items()):
+            yield "", _format_labels(self.labelnames, values), child.value
+
+
+class GaugeChild:
+    __slots__ = ("_lock", "_value", "_function")
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._value = 0.0
+        self._function: Callable[[], float] | None = None
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self.inc(-amount)
+
+    def set_function(self, function: Callable[[], float] | None) -> None:
+        """Compute the value at collection time instead, None to stop."""
+        self._function = function
+
+    @property
+    def value(self) -> float:
+        function = self._function
+        return float(function()) if function is not None else self._value
+
+
+class Gauge(_Metric[GaugeChild]):
+    """Value that can go up and down."""
+
+    type_name = "gauge"
+
+    def _new_child(self) -> GaugeChild:
+        return GaugeChild()
+
+    def set(self, value: float) -> None:
+        self._default().set(value)
+
+    def inc(self, amount: float = 1) -> None:
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1) -> None:
+        self._default().dec(amount)
+
+    def set_function(self, function: Callable[[], float] | None) -> None:
+        self._default().set_function(function)
+
+    def _samples(self) -> Iterator[tuple[str, str, float]]:
+        for values, child in list(self._children.items()):
+            yield "", _format_labels(self.labelnames, values), child.value
+
+
+class HistogramChild:
+    __slots__ = ("_lock", "_upper_bounds", "_counts", "_sum")
+
+    def __init__(self, upper_bounds: tuple[float, ...]) -> None:
+        self._lock = threading.Lock()
+        self._upper_bounds = upper_bounds
+        # one count per bucket plus the +Inf bucket, not cumulative
+        self._counts = [0] * (len(upper_bounds) + 1)
+        self._sum = 0.0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self._upper_bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        """Observe the seconds spent in the block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def snapshot(self) -> tuple[list[int], float]:
+        with self._lock:
+            return list(self._counts), self._sum
+
+
+class Histogram(_Metric[HistogramChild]):
+    """Distribution of observed values over fixed buckets."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self._upper_bounds = tuple(sorted(b for b in buckets if not math.isinf(b)))
+
+    def _new_child(self) -> HistogramChild:
+        return HistogramChild(self._upper_bounds)
+
+    def observe(self, value: float) -> None:
+        self._default().observe(value)
+
+    def time(self) -> AbstractContextManager[None]:
+        return self._default().time()
+
+    def _samples(self) -> Iterator[tuple[str, str, float]]:
+        for values, child in list(self._children.items()):
+            counts, total = child.snapshot()
+            cumulative = 0
+            for bound, count in zip((*self._upper_bounds, math.inf), counts):
+                cumulative += count
+                labels = _format_labels(
+                    (*self.labelnames, "le"), (*values, _format_value(bound))
+                )
+                yield "_bucket", labels, cumulative
+            labels = _format_labels(self.labelnames, values)
+            yield "_sum", labels, total
+            yield "_count", labels, cumulative
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._metrics: dict[str, _Metric] = {}
+
+    def _register[MetricT: _Metric](self, metric: MetricT) -> MetricT:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(f"Metric {metric.name} is already registered")
+                return existing  # type: ignore[return-value]
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(
+        self, name: str, help: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        """Get or create a counter."""
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        """Get or create a gauge."""
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """Get or create a histogram."""
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "".join(metric.render() for metric in metrics)
+
+
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,236 @@
+"""On-demand cProfile and tracemalloc profiling of the live process.
+
+Code marks named phases (scan, hash, state mutation, diff, event processing)
+with `phase()`; while profiling is inactive a phase is a shared no-op
+context manager. `install_signal_handlers` lets SIGUSR1 toggle cProfile and
+SIGUSR2 write a tracemalloc snapshot without restarting the process. The
+handlers only queue the request for a control thread: they interrupt the
+main thread anywhere, possibly while it holds the profiler lock.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import queue
+import signal
+import tempfile
+import threading
+import time
+from collections.abc import Callable
+from contextlib import AbstractContextManager, nullcontext
+from datetime import UTC, datetime
+from pathlib import Path
+from types import FrameType, TracebackType
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import cProfile
+    import tracemalloc
+
+logger = logging.getLogger(__name__)
+
+PHASE_SCAN = "scan"
+PHASE_HASH = "hash"
+PHASE_STATE_MUTATION = "state_mutation"
+PHASE_DIFF = "diff"
+PHASE_EVENT_PROCESSING = "event_processing"
+
+MEMORY_TOP_STATISTICS = 50
+
+_NO_PHASE = nullcontext()
+
+
+def default_output_dir() -> Path:
+    """Get the directory profiles are written to when none is configured."""
+    return Path(tempfile.gettempdir()) / "ingest-watcher-profiles"
+
+
+class _Phase:
+    __slots__ = ("_profiler", "_name", "_start")
+
+    def __init__(self, profiler: Profiler, name: str) -> None:
+        self._profiler = profiler
+        self._name = name
+        self._start = 0.0
+
+    def __enter__(self) -> None:
+        self._start = time.perf_counter()
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self._profiler._record_phase(self._name, time.perf_counter() - self._start)
+
+
+class Profiler:
+    """Start and stop cProfile and write tracemalloc snapshots to files."""
+
+    def __init__(self, output_dir: Path | None = None) -> None:
+        self.output_dir = output_dir if output_dir is not None else default_output_dir()
+        self._lock = threading.Lock()
+        self._profile: cProfile.Profile | None = None
+        # phase name -> [calls, seconds], phases nest so times are inclusive
+        self._phases: dict[str, list[float]] = {}
+        self._last_memory: tracemalloc.Snapshot | None = None
+        # SimpleQueue.put is reentrant, signal handlers can call it anywhere
+        self._requests: queue.SimpleQueue[Callable[[], object]] = queue.SimpleQueue()
+        self._control_thread: threading.Thread | None = None
+
+    @property
+    def active(self) -> bool:
+        return self._profile is not None
+
+    def phase(self, name: str) -> AbstractContextManager[None]:
+        """Time a named phase while profiling is active."""
+        if self._profile is None:
+            return _NO_PHASE
+        return _Phase(self, name)
+
+    def _record_phase(self, name: str, seconds: float) -> None:
+        with self._lock:
+            stats = self._phases.setdefault(name, [0, 0.0])
+            stats[0] += 1
+            stats[1] += seconds
+
+    def _path(self, kind: str, suffix: str) -> Path:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        timestamp = datetime.now(UTC).strftime("%Y%m%dT%H%M%S%fZ")
+        return self.output_dir / f"{kind}-{timestamp}-{os.getpid()}{suffix}"
+
+    def start(self) -> None:
+        """Start collecting a cProfile profile, does nothing if already started.
+
+        cProfile records calls through `sys.monitoring`, which reports them
+        for every thread, so the watcher and delivery threads are profiled
+        even when SIGUSR1 starts the profile on the idle main thread.
+        """
+        import cProfile
+
+        with self._lock:
+            if self._profile is not None:
+                return
+            self._phases = {}
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        logger.info("Profiling started")
+
+    def stop(self) -> Path | None:
+        """Stop profiling and write the profile, return its path if it ran.
+
+        The profile is written as pstats, with a JSON summary of the phases
+        next to it under the same name.
+        """
+        with self._lock:
+            profile, self._profile = self._profile, None
+            phases, self._phases = self._phases, {}
+        if profile is None:
+            return None
+
+        profile.disable()
+        path = self._path("profile", ".pstats")
+        profile.dump_stats(path)
+        path.with_suffix(".phases.json").write_text(
+            json.dumps(
+                {
+                    name: {"calls": int(calls), "seconds": seconds}
+                    for name, (calls, seconds) in sorted(phases.items())
+                },
+                indent=2,
+            ),
+            encoding="utf-8",
+        )
+        logger.info("Profile written to %s", path)
+
+        return path
+
+    def toggle(self) -> Path | None:
+        """Start profiling, or stop it and return the written profile."""
+        if self.active:
+            return self.stop()
+        self.start()
+        return None
+
+    def snapshot_memory(self) -> Path | None:
+        """Write the allocations since tracing started, start it on first call.
+
+        Returns None when tracing was just started. Later calls write the
+        top allocation sites and the growth since the previous snapshot.
+        """
+        import tracemalloc
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(25)
+            self._last_memory = None
+            logger.info("Memory tracing started")
+            return None
+
+        snapshot = tracemalloc.take_snapshot()
+        path = self._path("memory", ".txt")
+        lines = [f"Top {MEMORY_TOP_STATISTICS} allocation sites:"]
+        lines += map(str, snapshot.statistics("lineno")[:MEMORY_TOP_STATISTICS])
+        if self._last_memory is not None:
+            lines += ["", f"Top {MEMORY_TOP_STATISTICS} growths since last snapshot:"]
+            growth = snapshot.compare_to(self._last_memory, "lineno")
+            lines += map(str, growth[:MEMORY_TOP_STATISTICS])
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        snapshot.dump(str(path.with_suffix(".tracemalloc")))
+        self._last_memory = snapshot
+        logger.info("Memory snapshot written to %s", path)
+
+        return path
+
+
+    def request(self, action: Callable[[], object]) -> None:
+        """Run an action on the control thread, safe to call in signal handlers."""
+        self._requests.put(action)
+
+    def start_control_thread(self) -> None:
+        """Start the thread running requested actions, once per profiler."""
+        if self._control_thread is not None:
+            return
+        self._control_thread = threading.Thread(
+            target=self._serve_requests, name="profiler-control", daemon=True
+        )
+        self._control_thread.start()
+
+    def _serve_requests(self) -> None:
+        while True:
+            action = self._requests.get()
+            try:
+                action()
+            except Exception:
+                logger.exception("Profiling request failed")
+
+
+PROFILER = Profiler()
+
+
+def phase(name: str) -> AbstractContextManager[None]:
+    """Time a named phase of the process wide profiler."""
+    return PROFILER.phase(name)
+
+
+def install_signal_handlers(profiler: Profiler = PROFILER) -> None:
+    """Toggle cProfile on SIGUSR1 and snapshot memory on SIGUSR2.
+
+    Must be called from the main thread. Does nothing on platforms without
+    these signals. The profiler control thread acts on the signals, shortly
+    after the handlers return.
+    """
+    if not hasattr(signal, "SIGUSR1"):
+        return
+    profiler.start_control_thread()
+
+    def on_toggle(signum: int, frame: FrameType | None) -> None:
+        profiler.request(profiler.toggle)
+
+    def on_memory(signum: int, frame: FrameType | None) -> None:
+        profiler.request(profiler.snapshot_memory)
+
+    signal.signal(signal.SIGUSR1, on_toggle)
+    signal.signal(signal.SIGUSR2, on_memory)
@@ -0,0 +1,294 @@
+"""Watch several roots with one worker process per root.
+
+Every worker owns the snapshot of its root and sends the events it
+processes to the supervisor as frames of journal records over a pipe. The
+supervisor merges the frames into a single feed, in order for each root,
+and restarts workers that crash. A worker only counts a frame as processed,
+and commits it to its journal, once the supervisor acknowledged it.
+"""
+
+import hashlib
+import logging
+import multiprocessing
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from multiprocessing.connection import Connection, wait
+from multiprocessing.process import BaseProcess
+from pathlib import Path
+
+from ingest_watcher.application.instrumentation import process_events
+from ingest_watcher.bootstrap import IngestWatcherConfig, build_app, build_processor
+from ingest_watcher.domain.events import SnapshotEvent
+from ingest_watcher.infrastructure.event_journal import encode_record, iter_records
+from ingest_watcher.infrastructure.http_event_delivery import HttpEventDelivery
+from ingest_watcher.infrastructure.metrics_server import start_metrics_server
+from ingest_watcher.metrics import REGISTRY
+from ingest_watcher.profiling import install_signal_handlers
+
+logger = logging.getLogger(__name__)
+
+# workers are spawned, forking a process running threads can deadlock
+WORKER_START_METHOD = "spawn"
+WAIT_TIMEOUT = 0.5
+
+# replies of the supervisor to a frame
+FRAME_ACK = b"\x06"
+FRAME_NACK = b"\x15"
+
+ROOT_WORKER_RESTARTS = REGISTRY.counter(
+    "ingest_watcher_root_worker_restarts_total",
+    "Root worker processes restarted after exiting.",
+    ["root"],
+)
+ROOT_WORKERS_RUNNING = REGISTRY.gauge(
+    "ingest_watcher_root_workers_running", "Root worker processes running."
+)
+
+
+def root_key(root_path: str) -> str:
+    """Get a name for a root that is stable across restarts and reorders."""
+    digest = hashlib.md5(root_path.encode()).hexdigest()[:8]
+    return f"{Path(root_path).name or 'root'}-{digest}"
+
+
+def config_for_root(
+    config: IngestWatcherConfig, root_path: str
+) -> IngestWatcherConfig:
+    """Derive the configuration of the worker watching a single root.
+
+    Journals, checkpoints and progress files get a name per root. The
+    supervisor serves its metrics on the metrics port and the worker of the
+    n-th root those of its root on the port n after it, a free port picked
+    by the supervisor would be unknown to scrapers so workers serve none.
+    """
+    key = root_key(root_path)
+    roots = list(dict.fromkeys([config.root_path, *config.root_paths]))
+    update: dict[str, object] = {
+        "root_path": root_path,
+        "root_paths": [],
+        "metrics_port": (
+            config.metrics_port + 1 + roots.index(root_path)
+            if config.metrics_port
+            else None
+        ),
+    }
+    if config.journal_path is not None:
+        update["journal_path"] = str(Path(config.journal_path) / key)
+    if config.scan_checkpoint_path is not None:
+        update["scan_checkpoint_path"] = f"{config.scan_checkpoint_path}.{key}"
+    if config.scan_progress_path is not None:
+        update["scan_progress_path"] = f"{config.scan_progress_path}.{key}"
+
+    return config.model_copy(update=update)
+
+
+class FrameRejectedError(Exception):
+    """Raised when the supervisor failed to process a frame of events."""
+
+
+class FrameSender:
+    """Event processor sending events in frames over a connection.
+
+    Every frame waits for the reply of the supervisor, so the events are
+    processed once `flush` returns.
+    """
+
+    def __init__(self, connection: Connection, max_events: int) -> None:
+        self._connection = connection
+        self._max_events = max_events
+        self._records: list[bytes] = []
+
+    def __call__(self, event: SnapshotEvent) -> None:
+        self._records.append(encode_record(event))
+        if len(self._records) >= self._max_events:
+            self.flush()
+
+    def flush(self) -> None:
+        """Send the events held back as a single frame and wait for its reply.
+
+        Raises FrameRejectedError if the supervisor failed to process them.
+        """
+        if not self._records:
+            return
+        records, self._records = self._records, []
+        self._connection.send_bytes(b"".join(records))
+        if self._connection.recv_bytes() != FRAME_ACK:
+            raise FrameRejectedError(f"Supervisor rejected {len(records)} events")
+
+
+def run_root_worker(config: IngestWatcherConfig, connection: Connection) -> None:
+    """Watch a single root and send its events to the supervisor."""
+    # SIGUSR1 and SIGUSR2 would otherwise terminate the worker
+    install_signal_handlers()
+    app = build_app(config, FrameSender(connection, config.event_batch_size))
+    try:
+        app.watch(threading.Event())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        app.close()
+        connection.close()
+
+
+@dataclass
+class _RootWorker:
+    root_path: str
+    config: IngestWatcherConfig
+    process: BaseProcess | None = None
+    connection: Connection | None = None
+    started_at: float = 0.0
+    restart_at: float = 0.0
+    restart_delay: float = 0.0
+    crashes: int = 0
+
+
+class RootSupervisor:
+    """Run a worker process per root and merge their events."""
+
+    def __init__(
+        self,
+        config: IngestWatcherConfig,
+        processor: Callable[[SnapshotEvent], None] | None = None,
+    ) -> None:
+        self._config = config
+        self._processor = (
+            processor if processor is not None else build_processor(config)
+        )
+        self._context = multiprocessing.get_context(WORKER_START_METHOD)
+        self._workers = [
+            _RootWorker(root, config_for_root(config, root))
+            for root in dict.fromkeys([config.root_path, *config.root_paths])
+        ]
+
+    @property
+    def root_paths(self) -> list[str]:
+        return [worker.root_path for worker in self._workers]
+
+    @property
+    def worker_pids(self) -> dict[str, int | None]:
+        """Get the worker pid of each root, None while it waits for a restart."""
+        return {
+            w.root_path: w.process.pid if w.process is not None else None
+            for w in self._workers
+        }
+
+    @property
+    def crashes(self) -> dict[str, int]:
+        """Get the number of times the worker of each root exited."""
+        return {w.root_path: w.crashes for w in self._workers}
+
+    def _start(self, worker: _RootWorker) -> None:
+        connection, worker_connection = self._context.Pipe()
+        process = self._context.Process(
+            target=run_root_worker,
+            args=(worker.config, worker_connection),
+            name=f"root-worker-{root_key(worker.root_path)}",
+            daemon=True,
+        )
+        process.start()
+        # the worker holds the only other end, so its exit is seen as EOF
+        worker_connection.close()
+
+        worker.process = process
+        worker.connection = connection
+        worker.started_at = time.monotonic()
+        logger.info("Started worker %s for %s", process.pid, worker.root_path)
+
+    def _stop(self, worker: _RootWorker) -> None:
+        if worker.process is not None:
+            worker.process.terminate()
+            worker.process.join()
+            worker.process = None
+        if worker.connection is not None:
+            worker.connection.close()
+            worker.connection = None
+
+    def _receive(self, worker: _RootWorker) -> None:
+        """Process a frame of a worker, or schedule its restart on exit.
+
+        A frame that failed to process is rejected, the worker keeps it in
+        its journal, while the other workers go on.
+        """
+        assert worker.connection is not None
+        try:
+            frame = worker.connection.recv_bytes()
+        except (EOFError, OSError):
+            self._on_exit(worker)
+            return
+
+        reply = FRAME_ACK
+        try:
+            process_events(iter_records(frame), self._processor)
+        except Exception:
+            logger.exception("Cannot process events of %s", worker.root_path)
+            reply = FRAME_NACK
+        try:
+            worker.connection.send_bytes(reply)
+        except OSError:
+            # exited meanwhile, seen as EOF on the next wait
+            pass
+
+    def _on_exit(self, worker: _RootWorker) -> None:
+        assert worker.process is not None
+        worker.process.join()
+        exitcode = worker.process.exitcode
+        uptime = time.monotonic() - worker.started_at
+        self._stop(worker)
+
+        # a worker that ran for a while crashed anew, not in a loop
+        if uptime > self._config.worker_restart_max_delay:
+            worker.restart_delay = 0.0
+        worker.restart_delay = min(
+            max(worker.restart_delay * 2, self._config.worker_restart_delay),
+            self._config.worker_restart_max_delay,
+        )
+        worker.restart_at = time.monotonic() + worker.restart_delay
+        worker.crashes += 1
+        ROOT_WORKER_RESTARTS.labels(worker.root_path).inc()
+        logger.error(
+            "Worker for %s exited with %s, restarting in %.1fs",
+            worker.root_path,
+            exitcode,
+            worker.restart_delay,
+        )
+
+    def run(self, stop: threading.Event) -> None:
+        """Run the workers until stopped, restarting those that exit.
+
+        A restarted worker scans its root again, without a journal and scan
+        checkpoint the events of that scan repeat ones already processed.
+        """
+        metrics_server = (
+            start_metrics_server(self._config.metrics_host, self._config.metrics_port)
+            if self._config.metrics_port is not None
+            else None
+        )
+        ROOT_WORKERS_RUNNING.set_function(
+            lambda: sum(w.process is not None for w in self._workers)
+        )
+        try:
+            for worker in self._workers:
+                self._start(worker)
+            while not stop.is_set():
+                now = time.monotonic()
+                for worker in self._workers:
+                    if worker.process is None and worker.restart_at <= now:
+                        self._start(worker)
+
+                running = {
+                    worker.connection: worker
+                    for worker in self._workers
+                    if worker.connection is not None
+                }
+                for connection in wait(list(running), WAIT_TIMEOUT):
+                    self._receive(running[connection])
+        finally:
+            for worker in self._workers:
+                self._stop(worker)
+            ROOT_WORKERS_RUNNING.set_function(None)
+            if isinstance(self._processor, HttpEventDelivery):
+                self._processor.close()
+            if metrics_server is not None:
+                metrics_server.stop()
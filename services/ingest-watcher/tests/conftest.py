@@ -2,6 +2,8 @@ from pathlib import Path
 
 import pytest
 
+from ingest_watcher.infrastructure import file_scanner
+
 
 @pytest.fixture
 def media_root(tmp_path: Path) -> Path:
@@ -20,3 +22,17 @@ def media_file(media_root: Path):
             full_path.write_bytes(content)
 
     return _make_file
+
+
+@pytest.fixture
+def hashed_paths(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """Record the paths hashed by the scanner."""
+    paths: list[str] = []
+    compute_md5 = file_scanner.compute_md5
+
+    def _compute_md5(path: str, *args, **kwargs) -> str:
+        paths.append(path)
+        return compute_md5(path, *args, **kwargs)
+
+    monkeypatch.setattr(file_scanner, "compute_md5", _compute_md5)
+    return paths
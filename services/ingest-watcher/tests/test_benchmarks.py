@@ -0,0 +1,55 @@
+from benchmarks.bench_snapshot_state import (
+    IMPLEMENTATIONS,
+    METRICS,
+    find_regressions,
+    run_benchmarks,
+)
+from benchmarks.media_tree import LAYOUTS, generate_churn, generate_media_tree
+
+
+def test_media_tree_is_deterministic():
+    for layout in LAYOUTS:
+        first = generate_media_tree(layout, 500, seed=7)
+        second = generate_media_tree(layout, 500, seed=7)
+
+        assert first == second
+        assert len(first) == 500
+        assert len({path for path, _ in first}) == 500
+        assert generate_media_tree(layout, 500, seed=8) != first
+
+
+def test_deep_layout_nests_shows_seasons_and_episodes():
+    files = generate_media_tree("deep", 2000)
+    episodes = [path for path, _ in files if path.startswith("/media/shows/")]
+
+    assert episodes
+    assert all(len(path.split("/")) == 6 for path in episodes)
+    assert all("/Season " in path for path in episodes)
+
+
+def test_churn_touches_the_requested_fraction():
+    files = generate_media_tree("churn", 900)
+    operations = generate_churn(files, fraction=0.3)
+
+    assert len(operations) == 270
+    assert {op.kind for op in operations} == {"add", "remove", "update"}
+    assert generate_churn(files, fraction=0.3) == operations
+
+
+def test_suite_runs_every_implementation_and_flags_regressions():
+    results = run_benchmarks(300, list(LAYOUTS), sorted(IMPLEMENTATIONS))
+
+    for by_layout in results.values():
+        for metrics in by_layout.values():
+            assert set(metrics) == set(METRICS)
+            assert all(value >= 0 for value in metrics.values())
+
+    assert find_regressions(results, results, tolerance=0.0) == []
+    halved = {
+        name: {
+            layout: {metric: value / 2 for metric, value in metrics.items()}
+            for layout, metrics in by_layout.items()
+        }
+        for name, by_layout in results.items()
+    }
+    assert find_regressions(results, halved, tolerance=0.25)
@@ -0,0 +1,101 @@
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from ingest_watcher.bootstrap import (
+    IngestWatcherApp,
+    IngestWatcherConfig,
+    build_app,
+)
+from ingest_watcher.domain.entities import Snapshot, SnapshotEntryStats
+from ingest_watcher.domain.events import SnapshotEvent
+from ingest_watcher.infrastructure.event_journal import EventJournal
+from ingest_watcher.infrastructure.in_memory_tree_snapshot_state import (
+    InMemoryTreeSnapshotState,
+)
+
+STATS = SnapshotEntryStats(md5="0" * 32, size=1)
+
+
+class ProcessorFailed(Exception):
+    pass
+
+
+def make_app(
+    tmp_path: Path,
+    processor,
+    segment_max_bytes: int = 64 * 1024 * 1024,
+) -> IngestWatcherApp:
+    config = IngestWatcherConfig(
+        root_path="/r", journal_path=str(tmp_path / "journal"), event_batch_size=2
+    )
+    snapshot = Snapshot(id="test", state_store=InMemoryTreeSnapshotState("/r"))
+    journal = EventJournal(Path(config.journal_path), segment_max_bytes)
+    return IngestWatcherApp(config, snapshot, processor, journal)
+
+
+def test_events_of_a_failed_batch_are_processed_again(tmp_path: Path):
+    delivered: list[str] = []
+    failures = [ProcessorFailed()]
+
+    def processor(event: SnapshotEvent) -> None:
+        if failures:
+            raise failures.pop()
+        delivered.append(event.path)
+
+    app = make_app(tmp_path, processor)
+    try:
+        for name in "abc":
+            app.snapshot.add_file(f"/r/{name}", STATS)
+        with pytest.raises(ProcessorFailed):
+            app.process_events()
+        app.process_events()
+    finally:
+        app.close()
+
+    assert delivered == ["/r/a", "/r/b", "/r/c"]
+
+
+def test_processed_journal_segments_are_removed(tmp_path: Path):
+    app = make_app(tmp_path, lambda event: None, segment_max_bytes=64)
+    try:
+        for i in range(20):
+            app.snapshot.add_file(f"/r/{i:02}", STATS)
+        app.process_events()
+
+        segments = list((tmp_path / "journal").glob("*.log"))
+    finally:
+        app.close()
+
+    assert len(segments) == 1
+
+
+def test_watch_raises_errors_of_processing_changes(tmp_path: Path):
+    def processor(event: SnapshotEvent) -> None:
+        if event.path.endswith("new.bin"):
+            raise ProcessorFailed()
+
+    app = build_app(IngestWatcherConfig(root_path=str(tmp_path)), processor)
+    stop = threading.Event()
+    errors: list[BaseException] = []
+
+    def watch() -> None:
+        try:
+            app.watch(stop)
+        except BaseException as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=watch)
+    thread.start()
+    try:
+        time.sleep(0.5)
+        (tmp_path / "new.bin").write_bytes(b"new")
+        thread.join(timeout=10)
+    finally:
+        stop.set()
+        thread.join()
+        app.close()
+
+    assert [type(e) for e in errors] == [ProcessorFailed]
@@ -0,0 +1,90 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from ingest_watcher.__main__ import main
+
+SRC_PATH = Path(__file__).resolve().parent.parent / "src"
+
+# Cumulative import time budget of `ingest_watcher.__main__` in microseconds.
+IMPORT_TIME_BUDGET_US = 50_000
+
+HEAVY_MODULES = [
+    "pydantic",
+    "pydantic_settings",
+    "watchdog",
+    "ingest_watcher.bootstrap",
+]
+
+
+def import_times(*args: str) -> dict[str, int]:
+    """Run python with `-X importtime` and return cumulative import times."""
+    env = dict(os.environ, PYTHONPATH=str(SRC_PATH))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+
+    times: dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        times[name.strip()] = int(cumulative)
+
+    return times
+
+
+def test_help_does_not_import_heavy_modules():
+    times = import_times("-m", "ingest_watcher", "--help")
+
+    imported = [name for name in HEAVY_MODULES if name in times]
+    assert imported == [], f"Heavy modules imported eagerly: {imported}"
+
+
+def test_import_time_is_within_budget():
+    times = import_times("-c", "import ingest_watcher.__main__")
+
+    assert times["ingest_watcher.__main__"] < IMPORT_TIME_BUDGET_US, (
+        f"Importing the CLI took {times['ingest_watcher.__main__']}us"
+    )
+
+
+def test_scan_then_diff_reports_changes(
+    media_root: Path, media_file, tmp_path: Path, capsys: pytest.CaptureFixture[str]
+):
+    media_file({"movies/a.mp4": b"a", "movies/b.mp4": b"b"})
+    output = tmp_path / "snapshots"
+
+    assert main(["scan", str(media_root), "--quiet", "--output", str(output)]) == 0
+    manifest = capsys.readouterr().out.strip()
+
+    (media_root / "movies" / "b.mp4").unlink()
+    media_file({"movies/a.mp4": b"changed", "music/c.mp3": b"c"})
+
+    assert main(["diff", manifest, str(media_root), "--exit-code"]) == 1
+    lines = set(capsys.readouterr().out.splitlines())
+    assert lines == {
+        f"file_added: {media_root}/music/c.mp3",
+        f"file_removed: {media_root}/movies/b.mp4",
+        f"file_modified: {media_root}/movies/a.mp4",
+    }
+
+
+def test_stats_counts_files_and_directories(
+    media_root: Path, media_file, capsys: pytest.CaptureFixture[str]
+):
+    media_file({"shows/s01/e01.mkv": b"12345", "shows/s01/e02.mkv": b"123"})
+
+    assert main(["stats", str(media_root)]) == 0
+    out = capsys.readouterr().out
+
+    assert "files: 2" in out
+    assert "directories: 2" in out
+    assert "bytes: 8" in out
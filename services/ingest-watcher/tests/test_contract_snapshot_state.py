@@ -234,6 +234,39 @@ def run_common_snapshot_state_tests(make_snapshot_state: SnapshotStateFactory):
         files = state.get_all_files("/")
         assert files == ["/foo/a.txt", "/foo/bar/b.txt", "/foo/bar/baz/c.txt", "/foo/bar/baz/d.txt"], "Files should be correct"
 
+    def test_entry_count_counts_files_and_directories():
+        state = make_snapshot_state("/")
+        stats = SnapshotEntryStats(md5=md5("test".encode()).hexdigest(), size=100)
+        assert state.entry_count() == 0, "Empty snapshot should have no entries"
+
+        state.add_file("/foo/bar/a.txt", stats)
+        state.add_file("/foo/b.txt", stats)
+        assert state.entry_count() == 4, "Files and parents should be counted"
+
+        state.remove_directory("/foo/bar")
+        assert state.entry_count() == 2, "Removed entries should not be counted"
+
+    def test_links_are_grouped_by_inode():
+        state = make_snapshot_state("/")
+        content = md5("test".encode()).hexdigest()
+        linked = SnapshotEntryStats(md5=content, size=100, device=1, inode=7)
+        other = SnapshotEntryStats(md5=content, size=100, device=2, inode=7)
+
+        state.add_file("/movies/a.mkv", linked)
+        state.add_file("/seeding/a.mkv", linked)
+        state.add_file("/seeding/b.mkv", other)
+        assert sorted(state.get_links(1, 7)) == ["/movies/a.mkv", "/seeding/a.mkv"], "Links should be grouped"
+        assert state.get_links(3, 7) == [], "Unknown inode should have no links"
+
+        changed = state.update_file("/seeding/a.mkv", other)
+        assert not changed, "Same content on another inode should not be a change"
+        assert state.get_links(1, 7) == ["/movies/a.mkv"], "Inode should be kept current"
+        assert sorted(state.get_links(2, 7)) == ["/seeding/a.mkv", "/seeding/b.mkv"], "Inode should be kept current"
+
+        state.remove_directory("/seeding")
+        state.remove_file("/movies/a.mkv")
+        assert state.get_links(1, 7) == [] and state.get_links(2, 7) == [], "Removed files should not be links"
+
 
     return [
         test_file_does_not_exist,
@@ -255,4 +288,6 @@ def run_common_snapshot_state_tests(make_snapshot_state: SnapshotStateFactory):
         test_remove_directory_and_children_are_removed_recursively,
         test_add_file_to_directory_and_get_children_of_root,
         test_get_all_files_of_root,
+        test_entry_count_counts_files_and_directories,
+        test_links_are_grouped_by_inode,
     ]
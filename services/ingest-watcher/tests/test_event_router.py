@@ -0,0 +1,119 @@
+import pytest
+
+from ingest_watcher.application.event_router import EventRouter, SubscriberError
+from ingest_watcher.domain.events import SnapshotEvent, SnapshotEventType
+from ingest_watcher.domain.services import process_snapshot_events
+
+
+def added(path: str) -> SnapshotEvent:
+    return SnapshotEvent(event_type=SnapshotEventType.FILE_ADDED, path=path)
+
+
+def removed(path: str) -> SnapshotEvent:
+    return SnapshotEvent(event_type=SnapshotEventType.FILE_REMOVED, path=path)
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.batches: list[list[SnapshotEvent]] = []
+
+    def __call__(self, batch: list[SnapshotEvent]) -> None:
+        self.batches.append(batch)
+
+    @property
+    def paths(self) -> list[str]:
+        return [event.path for batch in self.batches for event in batch]
+
+
+def test_events_reach_subscribers_of_their_prefixes_only():
+    router = EventRouter()
+    movies, music, everything, removals = Recorder(), Recorder(), Recorder(), Recorder()
+    router.subscribe("movies", movies, ["/media/movies", "/media/movies/4k/"])
+    router.subscribe("music", music, ["/media/music"])
+    router.subscribe("everything", everything)
+    router.subscribe(
+        "removals", removals, ["/media"], event_types=[SnapshotEventType.FILE_REMOVED]
+    )
+    events = [
+        added("/media/movies/a.mkv"),
+        added("/media/movies/4k/b.mkv"),
+        added("/media/movies2/c.mkv"),
+        removed("/media/music/d.flac"),
+        added("/media/music"),
+    ]
+
+    process_snapshot_events(events, router)
+
+    assert movies.paths == ["/media/movies/a.mkv", "/media/movies/4k/b.mkv"]
+    assert music.paths == ["/media/music/d.flac", "/media/music"]
+    assert everything.paths == [event.path for event in events]
+    assert removals.paths == ["/media/music/d.flac"]
+
+
+def test_each_subscriber_gets_its_own_batches():
+    router = EventRouter()
+    small, large = Recorder(), Recorder()
+    router.subscribe("small", small, batch_size=2)
+    router.subscribe("large", large, batch_size=10)
+
+    for i in range(5):
+        router(added(f"/media/{i}.mkv"))
+
+    assert [len(batch) for batch in small.batches] == [2, 2]
+    assert large.batches == []
+    assert router.stats()["large"].pending == 5
+
+    router.flush()
+
+    assert [len(batch) for batch in small.batches] == [2, 2, 1]
+    assert [len(batch) for batch in large.batches] == [5]
+    stats = router.stats()
+    assert (stats["small"].delivered, stats["small"].batches) == (5, 3)
+    assert (stats["large"].delivered, stats["large"].pending) == (5, 0)
+
+
+def test_failing_subscriber_does_not_stop_the_others():
+    router = EventRouter()
+    recorder = Recorder()
+
+    def fail(batch: list[SnapshotEvent]) -> None:
+        raise RuntimeError("ingest is down")
+
+    router.subscribe("failing", fail, batch_size=2)
+    router.subscribe("working", recorder, batch_size=2)
+
+    with pytest.raises(SubscriberError):
+        process_snapshot_events([added(f"/media/{i}.mkv") for i in range(3)], router)
+
+    assert recorder.paths == ["/media/0.mkv", "/media/1.mkv", "/media/2.mkv"]
+    assert router.stats()["failing"].failed_batches == 2
+    router.flush()
+
+
+def test_unsubscribe_delivers_pending_events_and_stops_routing():
+    router = EventRouter()
+    movies, nested = Recorder(), Recorder()
+    router.subscribe("movies", movies, ["/media/movies"], batch_size=10)
+    router.subscribe("nested", nested, ["/media/movies/4k"])
+
+    router(added("/media/movies/4k/a.mkv"))
+    router.unsubscribe("movies")
+    router(added("/media/movies/4k/b.mkv"))
+    router(added("/media/movies/c.mkv"))
+
+    assert movies.paths == ["/media/movies/4k/a.mkv"]
+    assert nested.paths == ["/media/movies/4k/a.mkv", "/media/movies/4k/b.mkv"]
+    assert router.stats().keys() == {"nested"}
+
+    router.unsubscribe("nested")
+    router.subscribe("nested", nested, ["/media/movies/4k"])
+    router(added("/media/movies/4k/d.mkv"))
+    assert nested.paths[-1] == "/media/movies/4k/d.mkv"
+
+
+def test_subscriber_names_are_unique():
+    router = EventRouter()
+    router.subscribe("movies", Recorder())
+
+    with pytest.raises(ValueError):
+        router.subscribe("movies", Recorder())
@@ -0,0 +1,98 @@
+import os
+from pathlib import Path
+
+from watchdog.events import FileCreatedEvent
+
+from ingest_watcher.domain.entities import Snapshot, SnapshotEntryStats
+from ingest_watcher.infrastructure.file_scanner import scan_tree
+from ingest_watcher.infrastructure.file_snapshot_repository import (
+    FileSnapshotRepository,
+)
+from ingest_watcher.infrastructure.file_watcher import SnapshotEventHandler
+from ingest_watcher.infrastructure.in_memory_tree_snapshot_state import (
+    InMemoryTreeSnapshotState,
+)
+
+
+def make_snapshot(root: Path) -> Snapshot:
+    return Snapshot(id="test", state_store=InMemoryTreeSnapshotState(str(root)))
+
+
+def test_hard_links_are_hashed_once(
+    media_root: Path, media_file, hashed_paths: list[str]
+):
+    media_file({"movies/a.mkv": b"a" * 100, "movies/b.mkv": b"b" * 100})
+    (media_root / "seeding").mkdir()
+    os.link(media_root / "movies" / "a.mkv", media_root / "seeding" / "a.mkv.part")
+    snapshot = make_snapshot(media_root)
+
+    scan_tree(str(media_root), snapshot)
+
+    assert sorted(hashed_paths) == [
+        f"{media_root}/movies/a.mkv",
+        f"{media_root}/movies/b.mkv",
+    ]
+    linked = snapshot.get_stats(f"{media_root}/seeding/a.mkv.part")
+    original = snapshot.get_stats(f"{media_root}/movies/a.mkv")
+    assert linked is not None and original is not None
+    assert linked.md5 == original.md5 and linked.file_id == original.file_id
+    assert linked.mime != original.mime
+    assert sorted(snapshot.get_links(f"{media_root}/movies/a.mkv")) == [
+        f"{media_root}/movies/a.mkv",
+        f"{media_root}/seeding/a.mkv.part",
+    ]
+    assert snapshot.get_links(f"{media_root}/movies/b.mkv") == [
+        f"{media_root}/movies/b.mkv"
+    ]
+    assert snapshot.get_links(f"{media_root}/movies") == []
+
+
+def test_stats_of_links_are_equal_and_hash_alike():
+    stats = SnapshotEntryStats(md5="a" * 32, size=1, mime="video/x-matroska")
+    linked = stats.model_copy(update={"device": 1, "inode": 2, "mtime_ns": 3})
+
+    assert stats == linked
+    assert len({stats, linked}) == 1
+    assert len({stats, stats.model_copy(update={"size": 2})}) == 2
+
+
+def test_new_links_reuse_the_digest_of_files_in_the_snapshot(
+    media_root: Path, media_file, hashed_paths: list[str]
+):
+    media_file({"movies/a.mkv": b"a" * 100})
+    snapshot = make_snapshot(media_root)
+    # files already in the snapshot are skipped, like ones restored from a
+    # checkpoint
+    scan_tree(str(media_root), snapshot)
+    os.link(media_root / "movies" / "a.mkv", media_root / "movies" / "b.mkv")
+    scan_tree(str(media_root), snapshot)
+    os.link(media_root / "movies" / "a.mkv", media_root / "movies" / "c.mkv")
+    handler = SnapshotEventHandler(snapshot, lambda: None)
+    handler.dispatch(FileCreatedEvent(f"{media_root}/movies/c.mkv"))
+
+    assert hashed_paths == [f"{media_root}/movies/a.mkv"]
+    assert handler.error is None
+    assert len(snapshot.get_links(f"{media_root}/movies/a.mkv")) == 3
+
+    (media_root / "movies" / "c.mkv").write_bytes(b"c" * 100)
+    os.link(media_root / "movies" / "a.mkv", media_root / "movies" / "d.mkv")
+    handler.dispatch(FileCreatedEvent(f"{media_root}/movies/d.mkv"))
+
+    # the content changed since the links in the snapshot were hashed
+    assert hashed_paths[1:] == [f"{media_root}/movies/d.mkv"]
+
+
+def test_manifest_keeps_inodes(media_root: Path, media_file, tmp_path: Path):
+    media_file({"movies/a.mkv": b"a"})
+    os.link(media_root / "movies" / "a.mkv", media_root / "movies" / "b.mkv")
+    snapshot = make_snapshot(media_root)
+    scan_tree(str(media_root), snapshot)
+    repository = FileSnapshotRepository(tmp_path, InMemoryTreeSnapshotState)
+
+    repository.save(snapshot)
+    loaded = repository.load(repository.path_for(snapshot.id))
+
+    assert loaded.get_links(f"{media_root}/movies/b.mkv") == [
+        f"{media_root}/movies/a.mkv",
+        f"{media_root}/movies/b.mkv",
+    ]
@@ -0,0 +1,202 @@
+import json
+import random
+import threading
+import time
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from ingest_watcher.domain.events import SnapshotEvent, SnapshotEventType
+from ingest_watcher.domain.services import process_snapshot_events
+from ingest_watcher.infrastructure.http_event_delivery import (
+    DeliveryError,
+    HttpEventDelivery,
+)
+
+
+class StubIngestServer(ThreadingHTTPServer):
+    """Ingest API recording request bodies and answering scripted statuses."""
+
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _StubHandler)
+        self.lock = threading.Lock()
+        self.batches: list[list[str]] = []
+        self.events: list[tuple[str, str]] = []
+        self.statuses: list[int] = []
+        self.clients: set[tuple[str, int]] = set()
+        self.requests = 0
+        self.delay = 0.0
+        self.jitter = 0.0
+        self.concurrent = 0
+        self.max_concurrent = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/events"
+
+    def delivered(self) -> list[str]:
+        with self.lock:
+            return [path for batch in self.batches for path in batch]
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: StubIngestServer
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.clients.add(self.client_address)
+            server.concurrent += 1
+            server.max_concurrent = max(server.max_concurrent, server.concurrent)
+            status = server.statuses.pop(0) if server.statuses else 200
+        time.sleep(server.delay + random.uniform(0, server.jitter))
+        with server.lock:
+            server.concurrent -= 1
+            if status == 200:
+                events = json.loads(body)["events"]
+                server.batches.append([event["path"] for event in events])
+                server.events += [(e["event_type"], e["path"]) for e in events]
+
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+@pytest.fixture
+def server() -> Iterator[StubIngestServer]:
+    server = StubIngestServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_events(count: int) -> list[SnapshotEvent]:
+    return [
+        SnapshotEvent(event_type=SnapshotEventType.FILE_ADDED, path=f"/media/{i}.mkv")
+        for i in range(count)
+    ]
+
+
+def test_events_are_batched_by_size_over_one_connection(server: StubIngestServer):
+    delivery = HttpEventDelivery(server.url, batch_size=3, max_connections=1)
+    events = make_events(7)
+
+    try:
+        process_snapshot_events(events, delivery)
+    finally:
+        delivery.close()
+
+    assert [len(batch) for batch in server.batches] == [3, 3, 1]
+    assert server.delivered() == [event.path for event in events]
+    assert len(server.clients) == 1
+
+
+def test_pending_events_are_sent_after_the_batch_interval(server: StubIngestServer):
+    delivery = HttpEventDelivery(server.url, batch_size=100, batch_interval=0.05)
+    try:
+        for event in make_events(2):
+            delivery(event)
+
+        deadline = time.monotonic() + 5
+        while not server.delivered() and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        delivery.close()
+
+    assert server.batches == [["/media/0.mkv", "/media/1.mkv"]]
+
+
+def test_failed_requests_are_retried(server: StubIngestServer):
+    server.statuses = [503, 429]
+    delivery = HttpEventDelivery(server.url, backoff_base=0.01)
+
+    try:
+        process_snapshot_events(make_events(2), delivery)
+    finally:
+        delivery.close()
+
+    assert server.batches == [["/media/0.mkv", "/media/1.mkv"]]
+
+
+@pytest.mark.parametrize(("statuses", "requests"), [([400], 1), ([503, 503, 503], 3)])
+def test_flush_raises_when_a_batch_is_not_delivered(
+    server: StubIngestServer, statuses: list[int], requests: int
+):
+    server.statuses = list(statuses)
+    delivery = HttpEventDelivery(server.url, max_retries=2, backoff_base=0.01)
+
+    try:
+        with pytest.raises(DeliveryError):
+            process_snapshot_events(make_events(2), delivery)
+        # the failure is reported once, later batches are delivered again
+        process_snapshot_events(make_events(1), delivery)
+    finally:
+        delivery.close()
+
+    assert server.requests == requests + 1
+    assert server.batches == [["/media/0.mkv"]]
+
+
+def test_requests_in_flight_are_capped(server: StubIngestServer):
+    server.delay = 0.02
+    delivery = HttpEventDelivery(server.url, batch_size=1, max_connections=3)
+
+    try:
+        process_snapshot_events(make_events(30), delivery)
+    finally:
+        delivery.close()
+
+    assert sorted(server.delivered()) == sorted(e.path for e in make_events(30))
+    assert server.max_concurrent == 3
+    assert len(server.clients) <= 3
+
+
+def test_events_of_a_path_arrive_in_order(server: StubIngestServer):
+    server.jitter = 0.02
+    delivery = HttpEventDelivery(server.url, batch_size=1, max_connections=4)
+    events = [
+        SnapshotEvent(event_type=event_type, path=f"/media/{i % 3}.mkv")
+        for i in range(30)
+        for event_type in (SnapshotEventType.FILE_ADDED, SnapshotEventType.FILE_REMOVED)
+    ]
+
+    try:
+        process_snapshot_events(events, delivery)
+    finally:
+        delivery.close()
+
+    for path in {event.path for event in events}:
+        assert [t for t, p in server.events if p == path] == [
+            e.event_type.value for e in events if e.path == path
+        ]
+
+
+def test_flush_waits_for_batches_taken_by_the_linger_thread(
+    server: StubIngestServer,
+):
+    server.delay = 0.2
+    delivery = HttpEventDelivery(
+        server.url, batch_size=2, batch_interval=0.02, max_connections=1
+    )
+    events = make_events(5)
+
+    try:
+        # two batches take every slot, the lingering event waits for one
+        for event in events:
+            delivery(event)
+        time.sleep(0.1)
+        delivery.flush()
+        assert server.delivered() == [event.path for event in events]
+    finally:
+        delivery.close()
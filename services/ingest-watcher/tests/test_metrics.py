@@ -0,0 +1,117 @@
+import urllib.error
+import urllib.request
+
+import pytest
+
+from ingest_watcher.application.instrumentation import (
+    EVENTS_PROCESSED,
+    SNAPSHOT_EVENTS,
+    SNAPSHOT_EVENTS_PULLED,
+    CountingEventBuffer,
+    count_pulled_events,
+    process_events,
+)
+from ingest_watcher.domain.entities import Snapshot, SnapshotEntryStats
+from ingest_watcher.domain.event_buffer import InMemoryEventBuffer
+from ingest_watcher.domain.events import SnapshotEventType
+from ingest_watcher.infrastructure.in_memory_tree_snapshot_state import (
+    InMemoryTreeSnapshotState,
+)
+from ingest_watcher.infrastructure.metrics_server import start_metrics_server
+from ingest_watcher.metrics import MetricsRegistry, _Metric
+
+STATS = SnapshotEntryStats(md5="5d41402abc4b2a76b9719d911017c592", size=10)
+
+
+def test_counter_and_gauge_render_as_prometheus_text():
+    registry = MetricsRegistry()
+    counter = registry.counter("requests_total", "Requests served.", ["code"])
+    counter.labels("200").inc()
+    counter.labels("200").inc(2)
+    counter.labels('5"0\\0').inc()
+    gauge = registry.gauge("queue_depth", "Items queued.")
+    gauge.set_function(lambda: 7)
+
+    assert registry.render() == (
+        "# HELP requests_total Requests served.\n"
+        "# TYPE requests_total counter\n"
+        'requests_total{code="200"} 3\n'
+        'requests_total{code="5\\"0\\\\0"} 1\n'
+        "# HELP queue_depth Items queued.\n"
+        "# TYPE queue_depth gauge\n"
+        "queue_depth 7\n"
+    )
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+
+    assert registry.render().splitlines()[2:] == [
+        'latency_seconds_bucket{le="0.1"} 2',
+        'latency_seconds_bucket{le="1"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        "latency_seconds_sum 3.65",
+        "latency_seconds_count 4",
+    ]
+
+
+def test_registering_a_name_twice_returns_the_same_metric():
+    registry = MetricsRegistry()
+    counter = registry.counter("events_total", "Events.")
+
+    assert registry.counter("events_total", "Events.") is counter
+    with pytest.raises(ValueError):
+        registry.gauge("events_total", "Events.")
+
+
+def test_events_are_counted_per_type_when_emitted_then_pulled_and_processed():
+    added = SNAPSHOT_EVENTS.labels(SnapshotEventType.FILE_ADDED.value)
+    removed = SNAPSHOT_EVENTS.labels(SnapshotEventType.FILE_REMOVED.value)
+    added_before, removed_before = added.value, removed.value
+    pulled_before = SNAPSHOT_EVENTS_PULLED.labels().value
+    processed_before = EVENTS_PROCESSED.labels().value
+    snapshot = Snapshot(
+        id="test",
+        state_store=InMemoryTreeSnapshotState("/media"),
+        event_buffer=CountingEventBuffer(InMemoryEventBuffer()),
+    )
+
+    snapshot.add_file("/media/a.mp4", STATS)
+    snapshot.add_file("/media/b.mp4", STATS)
+    snapshot.add_file("/media/b.mp4", STATS)
+    snapshot.remove_file("/media/a.mp4")
+
+    assert added.value - added_before == 2
+    assert removed.value - removed_before == 1
+    assert SNAPSHOT_EVENTS_PULLED.labels().value == pulled_before
+
+    for batch in count_pulled_events(snapshot.pull_event_batches(2)):
+        process_events(batch, lambda event: None)
+
+    assert SNAPSHOT_EVENTS_PULLED.labels().value - pulled_before == 3
+    assert EVENTS_PROCESSED.labels().value - processed_before == 3
+
+
+def test_metrics_must_implement_children_and_samples():
+    with pytest.raises(TypeError):
+        _Metric("broken_total", "Broken.")  # type: ignore[abstract]
+
+
+def test_server_exposes_metrics_endpoint():
+    registry = MetricsRegistry()
+    registry.counter("scrapes_total", "Scrapes.").inc()
+    server = start_metrics_server("127.0.0.1", 0, registry)
+    try:
+        url = f"http://127.0.0.1:{server.port}"
+        with urllib.request.urlopen(f"{url}/metrics") as response:
+            assert response.headers["Content-Type"].startswith("text/plain")
+            assert "scrapes_total 1" in response.read().decode()
+
+        with pytest.raises(urllib.error.HTTPError) as exc_info:
+            urllib.request.urlopen(f"{url}/other")
+        assert exc_info.value.code == 404
+    finally:
+        server.stop()
@@ -0,0 +1,125 @@
+from pathlib import PurePosixPath
+
+import pytest
+
+from ingest_watcher.domain.entities import Snapshot, SnapshotEntryStats
+from ingest_watcher.domain.paths import (
+    intern_directory,
+    is_within,
+    normalize_path,
+    parent_path,
+    subtree_path,
+)
+from ingest_watcher.infrastructure.in_memory_tree_snapshot_state import (
+    InMemoryTreeSnapshotState,
+)
+from ingest_watcher.infrastructure.sharded_snapshot_state import ShardedSnapshotState
+
+STATS = SnapshotEntryStats(md5="0" * 32, size=1)
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "/",
+        "/media",
+        "/media/movies/a.mkv",
+        "/media/",
+        "/media//movies///a.mkv",
+        "/media/./movies/.",
+        "/media/.hidden/a.mkv",
+        "//media",
+        "///media//",
+        "/./",
+    ],
+)
+def test_normalize_matches_pure_posix_path(path: str):
+    assert normalize_path(path) == str(PurePosixPath(path))
+
+
+def test_normalized_paths_are_returned_as_is_and_cached():
+    path = "/media/movies/a.mkv"
+    assert normalize_path(path) is path
+
+    hits = normalize_path.cache_info().hits
+    assert normalize_path("/media//movies/b.mkv") is normalize_path(
+        "/media//movies/b.mkv"
+    )
+    assert normalize_path.cache_info().hits == hits + 1
+
+
+@pytest.mark.parametrize("path", ["media/a.mkv", "/media/../etc", "/media/.."])
+def test_relative_paths_and_parent_segments_are_rejected(path: str):
+    with pytest.raises(ValueError):
+        normalize_path(path)
+
+
+@pytest.mark.parametrize(
+    ("path", "root", "within"),
+    [
+        ("/media", "/media", True),
+        ("/media/a.mkv", "/media", True),
+        ("/media2", "/media", False),
+        ("/media2/a.mkv", "/media", False),
+        ("/med", "/media", False),
+        ("/media", "/", True),
+        ("/", "/", True),
+    ],
+)
+def test_containment_is_checked_by_segment(path: str, root: str, within: bool):
+    assert is_within(path, root) is within
+
+
+def test_parents_and_subtrees_are_interned():
+    a = "".join(["/media/movies/", "a.mkv"])
+    b = "".join(["/media/movies/", "b.mkv"])
+
+    assert parent_path(a) == "/media/movies"
+    assert parent_path(a) is parent_path(b)
+    assert parent_path("/media") == "/"
+    assert subtree_path(a, "/media") is subtree_path(b, "/media")
+    assert subtree_path(a, "/") == "/media"
+    assert subtree_path("/media", "/media") is None
+
+
+def test_events_share_the_paths_kept_by_the_state():
+    snapshot = Snapshot("test", InMemoryTreeSnapshotState("/media"))
+    directory = "".join(["/media/", "movies"])
+
+    snapshot.add_directory(directory + "/")
+    snapshot.add_file("/media/movies//a.mkv", STATS)
+    added_directory, added_file = snapshot.pull_events()
+
+    assert added_directory.path is snapshot.get_children("/media")[0]
+    assert added_directory.path is intern_directory(directory)
+    assert added_file.path == "/media/movies/a.mkv"
+
+
+@pytest.mark.parametrize(
+    ("path", "root", "depth", "subtree"),
+    [
+        ("/media/movies/a/b.mkv", "/media", 2, "/media/movies/a"),
+        ("/media/movies/a", "/media", 2, "/media/movies/a"),
+        ("/media/movies", "/media", 2, None),
+        ("/media/movies/a", "/", 2, "/media/movies"),
+        ("/media/movies/a", "/media", 3, None),
+    ],
+)
+def test_subtrees_are_cut_at_a_depth(
+    path: str, root: str, depth: int, subtree: str | None
+):
+    assert subtree_path(path, root, depth) == subtree
+
+
+@pytest.mark.parametrize(
+    "make_state",
+    [InMemoryTreeSnapshotState, lambda root: ShardedSnapshotState(root, shards=2)],
+)
+def test_states_reject_paths_sharing_a_prefix_with_the_root(make_state):
+    state = make_state("/media")
+
+    with pytest.raises(ValueError):
+        state.exists("/media2/a.mkv")
+    assert not state.exists("/media//movies")
+    state.add_directory("/media//movies/")
+    assert state.get_children("/media/") == ["/media/movies"]
@@ -0,0 +1,170 @@
+import json
+import os
+import pstats
+import signal
+import threading
+import time
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+
+from ingest_watcher.__main__ import main
+from ingest_watcher.profiling import (
+    PHASE_HASH,
+    PHASE_SCAN,
+    PHASE_STATE_MUTATION,
+    PROFILER,
+    Profiler,
+    install_signal_handlers,
+)
+
+
+@pytest.fixture
+def profiler(tmp_path: Path):
+    profiler = Profiler(tmp_path / "profiles")
+    yield profiler
+    profiler.stop()
+
+
+@pytest.fixture
+def global_profiler_dir(tmp_path: Path):
+    """Point the process wide profiler to a temporary directory."""
+    output_dir = PROFILER.output_dir
+    yield tmp_path / "profiles"
+    PROFILER.stop()
+    PROFILER.output_dir = output_dir
+
+
+TIMEOUT = 5.0
+
+
+def wait_until(condition: Callable[[], bool]) -> None:
+    deadline = time.monotonic() + TIMEOUT
+    while not condition():
+        assert time.monotonic() < deadline, "Timed out"
+        time.sleep(0.01)
+
+
+def busy_work() -> int:
+    return sum(i * i for i in range(10_000))
+
+
+def test_phase_records_nothing_while_inactive(profiler: Profiler):
+    with profiler.phase(PHASE_SCAN):
+        busy_work()
+
+    assert profiler.stop() is None
+    assert not profiler.output_dir.exists()
+
+
+def test_profile_and_phases_are_written_on_stop(profiler: Profiler):
+    profiler.start()
+    with profiler.phase(PHASE_SCAN):
+        for _ in range(3):
+            with profiler.phase(PHASE_HASH):
+                busy_work()
+    path = profiler.stop()
+
+    assert path is not None and path.parent == profiler.output_dir
+    assert "busy_work" in pstats.Stats(str(path)).get_stats_profile().func_profiles
+    phases = json.loads(path.with_suffix(".phases.json").read_text(encoding="utf-8"))
+    assert phases.keys() == {PHASE_HASH, PHASE_SCAN}
+    assert phases[PHASE_HASH]["calls"] == 3
+    assert phases[PHASE_SCAN]["seconds"] >= phases[PHASE_HASH]["seconds"]
+
+
+def test_work_on_other_threads_is_profiled(profiler: Profiler):
+    started, done = threading.Event(), threading.Event()
+
+    def worker() -> None:
+        started.set()
+        done.wait()
+        busy_work()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    started.wait()
+    profiler.start()
+    done.set()
+    thread.join()
+    path = profiler.stop()
+
+    assert path is not None
+    assert "busy_work" in pstats.Stats(str(path)).get_stats_profile().func_profiles
+
+
+def test_memory_snapshots_report_growth(profiler: Profiler):
+    assert profiler.snapshot_memory() is None
+    try:
+        first = profiler.snapshot_memory()
+        retained = [bytearray(1024) for _ in range(1000)]
+        second = profiler.snapshot_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert first is not None and second is not None and first != second
+    assert "growths since last snapshot" in second.read_text(encoding="utf-8")
+    assert second.with_suffix(".tracemalloc").exists()
+    assert len(retained) == 1000
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGUSR1"), reason="needs SIGUSR1")
+def test_signals_toggle_profiling(profiler: Profiler):
+    handlers = signal.getsignal(signal.SIGUSR1), signal.getsignal(signal.SIGUSR2)
+    install_signal_handlers(profiler)
+    try:
+        os.kill(os.getpid(), signal.SIGUSR1)
+        wait_until(lambda: profiler.active)
+        busy_work()
+        os.kill(os.getpid(), signal.SIGUSR1)
+        wait_until(lambda: not profiler.active)
+    finally:
+        signal.signal(signal.SIGUSR1, handlers[0])
+        signal.signal(signal.SIGUSR2, handlers[1])
+
+    assert len(list(profiler.output_dir.glob("profile-*.pstats"))) == 1
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGUSR1"), reason="needs SIGUSR1")
+def test_signals_do_not_wait_for_the_lock_held_by_the_interrupted_thread(
+    profiler: Profiler,
+):
+    handlers = signal.getsignal(signal.SIGUSR1), signal.getsignal(signal.SIGUSR2)
+    install_signal_handlers(profiler)
+    try:
+        # as if the signal arrived while a phase exit records its time
+        with profiler._lock:
+            os.kill(os.getpid(), signal.SIGUSR1)
+            os.kill(os.getpid(), signal.SIGUSR1)
+            assert not profiler.active
+        wait_until(lambda: len(list(profiler.output_dir.glob("*.pstats"))) == 1)
+    finally:
+        signal.signal(signal.SIGUSR1, handlers[0])
+        signal.signal(signal.SIGUSR2, handlers[1])
+
+
+def test_profile_flag_profiles_the_command(
+    media_root: Path, media_file, global_profiler_dir: Path
+):
+    media_file({"movies/a.mp4": b"a", "movies/b.mp4": b"b"})
+
+    assert (
+        main(
+            [
+                "--profile",
+                "--profile-dir",
+                str(global_profiler_dir),
+                "scan",
+                str(media_root),
+                "--quiet",
+            ]
+        )
+        == 0
+    )
+
+    [path] = global_profiler_dir.glob("profile-*.pstats")
+    phases = json.loads(path.with_suffix(".phases.json").read_text(encoding="utf-8"))
+    assert phases[PHASE_HASH]["calls"] == 2
+    assert {PHASE_SCAN, PHASE_STATE_MUTATION} <= phases.keys()
@@ -0,0 +1,127 @@
+from pathlib import Path
+
+import pytest
+
+from ingest_watcher.domain.entities import Snapshot
+from ingest_watcher.infrastructure.file_scanner import scan_tree
+from ingest_watcher.infrastructure.in_memory_tree_snapshot_state import (
+    InMemoryTreeSnapshotState,
+)
+from ingest_watcher.infrastructure.scan_checkpoint import ScanCheckpoint
+from ingest_watcher.infrastructure.scan_progress import (
+    ScanProgress,
+    ScanProgressReporter,
+    estimate_total_bytes,
+)
+
+TREE = {
+    "movies/a.mp4": b"a" * 10,
+    "movies/b.mp4": b"b" * 20,
+    "shows/s01/e01.mkv": b"c" * 30,
+    "shows/s01/e02.mkv": b"d" * 40,
+    "shows/s02/e01.mkv": b"e" * 50,
+}
+
+
+class ScanCrashed(Exception):
+    pass
+
+
+def make_snapshot(root: Path) -> Snapshot:
+    return Snapshot(id="test", state_store=InMemoryTreeSnapshotState(str(root)))
+
+
+def test_restarted_scan_skips_checkpointed_work(
+    media_root: Path, media_file, tmp_path: Path, hashed_paths: list[str]
+):
+    media_file(TREE)
+    checkpoint_path = tmp_path / "scan.checkpoint"
+
+    def crash_after_three_files() -> None:
+        if len(hashed_paths) >= 3:
+            raise ScanCrashed()
+
+    crashed = make_snapshot(media_root)
+    with pytest.raises(ScanCrashed):
+        scan_tree(
+            str(media_root),
+            crashed,
+            ScanCheckpoint(
+                checkpoint_path, interval=0, before_commit=crash_after_three_files
+            ),
+        )
+    hashed_before_crash = list(hashed_paths)
+    hashed_paths.clear()
+
+    resumed = make_snapshot(media_root)
+    checkpoint = ScanCheckpoint(checkpoint_path, interval=0)
+    assert checkpoint.restore(resumed) == 2
+    assert f"{media_root}/movies" in checkpoint.completed_directories
+    scan_tree(str(media_root), resumed, checkpoint)
+
+    assert len(hashed_paths) == 3
+    assert not set(hashed_paths) & set(hashed_before_crash[:2])
+    assert sorted(resumed.get_all_files()) == sorted(
+        f"{media_root}/{p}" for p in TREE
+    )
+    assert resumed.pull_events() != []
+
+
+def test_torn_checkpoint_tail_is_ignored(media_root: Path, media_file, tmp_path: Path):
+    media_file(TREE)
+    checkpoint_path = tmp_path / "scan.checkpoint"
+    scan_tree(
+        str(media_root), make_snapshot(media_root), ScanCheckpoint(checkpoint_path)
+    )
+    with open(checkpoint_path, "a", encoding="utf-8") as f:
+        f.write('{"path": "/torn')
+
+    snapshot = make_snapshot(media_root)
+    checkpoint = ScanCheckpoint(checkpoint_path)
+
+    assert checkpoint.restore(snapshot) == len(TREE)
+    assert snapshot.pull_events() == []
+    assert checkpoint_path.read_text(encoding="utf-8").endswith("\n")
+
+
+def test_progress_is_reported_to_file(media_root: Path, media_file, tmp_path: Path):
+    media_file(TREE)
+    progress_path = tmp_path / "progress.json"
+    progress = ScanProgress(root_path=str(media_root), bytes_total=300)
+
+    scan_tree(
+        str(media_root),
+        make_snapshot(media_root),
+        progress=progress,
+        reporter=ScanProgressReporter(progress_path),
+    )
+    reported = ScanProgress.read(progress_path)
+
+    assert reported.finished
+    assert reported.files_done == 5
+    assert reported.entries_done == 9
+    assert reported.bytes_done == reported.bytes_hashed == 150
+    assert reported.eta_seconds == 0.0
+
+
+def test_total_bytes_are_estimated_from_the_last_scan_of_the_root(
+    media_root: Path, media_file, tmp_path: Path
+):
+    media_file(TREE)
+    progress_path = tmp_path / "progress.json"
+    root = str(media_root)
+
+    assert estimate_total_bytes(root, progress_path) is None
+    scan_tree(
+        root,
+        make_snapshot(media_root),
+        progress=ScanProgress(root_path=root),
+        reporter=ScanProgressReporter(progress_path),
+    )
+
+    assert estimate_total_bytes(root, progress_path) == 150
+    assert estimate_total_bytes(str(media_root / "movies"), progress_path) is None
+
+    interrupted = ScanProgress(root_path=root, bytes_done=30, bytes_total=150)
+    ScanProgressReporter(progress_path).report(interrupted, force=True)
+    assert estimate_total_bytes(root, progress_path) == 150
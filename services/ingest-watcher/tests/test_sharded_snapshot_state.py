@@ -0,0 +1,204 @@
+import random
+import sys
+import threading
+from collections.abc import Callable
+from hashlib import md5
+from typing import cast
+
+import pytest
+from test_contract_snapshot_state import run_common_snapshot_state_tests
+
+from ingest_watcher.domain.entities import SnapshotEntryStats
+from ingest_watcher.domain.snapshot_state import SnapshotState
+from ingest_watcher.infrastructure.sharded_snapshot_state import (
+    ShardedSnapshotState,
+    StateOperation,
+)
+
+WRITERS = 8
+ROUNDS = 300
+
+
+def make_stats(content: str) -> SnapshotEntryStats:
+    return SnapshotEntryStats(md5=md5(content.encode()).hexdigest(), size=len(content))
+
+
+def make_sharded_snapshot_state(root_path: str) -> SnapshotState:
+    """Make a sharded snapshot state."""
+    return cast(SnapshotState, ShardedSnapshotState(root_path, shards=4))
+
+
+def make_single_shard_snapshot_state(root_path: str) -> SnapshotState:
+    """Make a sharded snapshot state with a single shard."""
+    return cast(SnapshotState, ShardedSnapshotState(root_path, shards=1))
+
+
+def make_deep_sharded_snapshot_state(root_path: str) -> SnapshotState:
+    """Make a sharded snapshot state sharding three levels below the root."""
+    return cast(SnapshotState, ShardedSnapshotState(root_path, 4, shard_depth=3))
+
+
+@pytest.mark.parametrize(
+    "test_func",
+    run_common_snapshot_state_tests(make_sharded_snapshot_state)
+    + run_common_snapshot_state_tests(make_single_shard_snapshot_state)
+    + run_common_snapshot_state_tests(make_deep_sharded_snapshot_state),
+)
+def test_snapshot_state_contract(test_func: Callable[[], None]):
+    """Test the snapshot state contract."""
+    test_func()
+
+
+def test_root_children_keep_insertion_order_across_shards():
+    state = ShardedSnapshotState("/media", shards=8)
+    names = [f"/media/library{i}" for i in range(20)]
+    for name in names:
+        state.add_file(f"{name}/movie.mp4", make_stats(name))
+
+    assert state.get_children("/media") == names
+    assert state.get_all_files() == [f"{name}/movie.mp4" for name in names]
+
+    state.remove_directory(names[3])
+    state.add_directory(names[3])
+
+    assert state.get_children("/media") == names[:3] + names[4:] + names[3:4]
+
+
+def test_deeper_shards_spread_few_top_level_directories():
+    libraries = ["/media/movies", "/media/music", "/media/photos"]
+    files = [f"{lib}/{i:03d}/{i}.mkv" for i in range(100) for lib in libraries]
+    shallow = ShardedSnapshotState("/media", shards=8)
+    deep = ShardedSnapshotState("/media", shards=8, shard_depth=2)
+    for state in (shallow, deep):
+        for path in files:
+            state.add_file(path, make_stats(path))
+
+    assert sum(count > 0 for count in shallow.shard_entry_counts()) <= 3
+    assert all(count > 0 for count in deep.shard_entry_counts())
+    assert deep.get_children("/media") == libraries
+    assert deep.get_all_files() == shallow.get_all_files()
+    assert deep.entry_count() == shallow.entry_count() == 603
+
+    assert deep.remove_directory("/media/music") == [
+        path for path in files if path.startswith("/media/music/")
+    ]
+    assert not deep.exists("/media/music/001")
+    assert deep.get_children("/media") == ["/media/movies", "/media/photos"]
+    assert deep.entry_count() == 402
+
+
+def test_batch_returns_results_of_each_operation():
+    state = ShardedSnapshotState("/media", shards=4)
+    stats = make_stats("a")
+
+    results = state.apply_batch(
+        [
+            StateOperation("add_file", "/media/movies/a.mp4", stats),
+            StateOperation("add_file", "/media/music/b.mp3", stats),
+            StateOperation("add_file", "/media/movies/a.mp4", stats),
+            StateOperation("update_file", "/media/music/b.mp3", make_stats("b")),
+            StateOperation("remove_directory", "/media/movies"),
+        ]
+    )
+
+    assert results == [True, True, False, True, ["/media/movies/a.mp4"]]
+    assert state.get_all_files() == ["/media/music/b.mp3"]
+
+
+@pytest.mark.parametrize("shard_depth", [1, 2])
+def test_concurrent_writers_and_readers_under_stress(shard_depth: int):
+    state = ShardedSnapshotState("/media", shards=4, shard_depth=shard_depth)
+    errors: list[BaseException] = []
+    stop = threading.Event()
+
+    def guarded(fn: Callable[[], None]) -> Callable[[], None]:
+        def run() -> None:
+            try:
+                fn()
+            except BaseException as e:
+                errors.append(e)
+                stop.set()
+
+        return run
+
+    def writer(n: int) -> None:
+        rng = random.Random(n)
+        for i in range(ROUNDS):
+            path = f"/media/writer{n}/dir{rng.randrange(5)}/file{i}.mkv"
+            assert state.add_file(path, make_stats(path))
+            assert state.update_file(path, make_stats(path + "2"))
+            if i % 3 == 0:
+                assert state.remove_file(path)
+            if i % 50 == 49:
+                state.remove_directory(f"/media/writer{n}/dir{rng.randrange(5)}")
+
+    def batch_writer() -> None:
+        # files are added and removed in pairs, a reader must never see an
+        # odd number of them
+        for i in range(ROUNDS):
+            pair = [f"/media/pairs/{i}/a.mp4", f"/media/pairs/{i}/b.mp4"]
+            state.apply_batch(
+                [StateOperation("add_file", p, make_stats(p)) for p in pair]
+            )
+            if i % 2:
+                state.apply_batch([StateOperation("remove_file", p) for p in pair])
+
+    def split_batch_writer() -> None:
+        # pairs in different top-level subtrees, so mostly on different shards
+        for i in range(ROUNDS):
+            pair = [f"/media/left{i % 4}/{i}.mp4", f"/media/right{i % 4}/{i}.mp4"]
+            state.apply_batch(
+                [StateOperation("add_file", p, make_stats(p)) for p in pair]
+            )
+            if i % 2:
+                state.apply_batch([StateOperation("remove_file", p) for p in pair])
+
+    def reader() -> None:
+        rng = random.Random()
+        while not stop.is_set():
+            assert len(state.get_all_files("/media/pairs")) % 2 == 0
+            i = rng.randrange(ROUNDS)
+            state.exists(f"/media/pairs/{i}/a.mp4")
+            state.get_stats(f"/media/writer{rng.randrange(WRITERS)}/dir0/file{i}.mkv")
+            children = state.get_children("/media")
+            assert sum(c.startswith("/media/left") for c in children) == sum(
+                c.startswith("/media/right") for c in children
+            )
+            files = state.get_all_files()
+            assert len(files) == len(set(files))
+            assert sum(f.startswith("/media/left") for f in files) == sum(
+                f.startswith("/media/right") for f in files
+            )
+
+    writers = [
+        threading.Thread(target=guarded(lambda n=n: writer(n))) for n in range(WRITERS)
+    ]
+    writers.append(threading.Thread(target=guarded(batch_writer)))
+    writers.append(threading.Thread(target=guarded(split_batch_writer)))
+    readers = [threading.Thread(target=guarded(reader)) for _ in range(4)]
+    # switch threads often so readers land between the shards of a batch
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)
+    try:
+        for t in writers + readers:
+            t.start()
+        for t in writers:
+            t.join()
+        stop.set()
+        for t in readers:
+            t.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+    assert errors == []
+    for n in range(WRITERS):
+        for path in state.get_all_files(f"/media/writer{n}"):
+            assert state.get_stats(path) == make_stats(path + "2")
+    pairs = [
+        f"/media/pairs/{i}/{name}.mp4" for i in range(0, ROUNDS, 2) for name in "ab"
+    ]
+    assert state.get_all_files("/media/pairs") == pairs
+    splits = {f"/media/{side}{k}" for side in ("left", "right") for k in range(4)}
+    assert set(state.get_children("/media")) == {
+        f"/media/writer{n}" for n in range(WRITERS)
+    } | {"/media/pairs"} | splits
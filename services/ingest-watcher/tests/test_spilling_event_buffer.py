@@ -0,0 +1,73 @@
+from ingest_watcher.domain.entities import Snapshot, SnapshotEntryStats
+from ingest_watcher.domain.events import SnapshotEvent, SnapshotEventType
+from ingest_watcher.infrastructure.in_memory_tree_snapshot_state import (
+    InMemoryTreeSnapshotState,
+)
+from ingest_watcher.infrastructure.spilling_event_buffer import SpillingEventBuffer
+
+STATS = SnapshotEntryStats(md5="5d41402abc4b2a76b9719d911017c592", size=10)
+
+
+def make_events(count: int, prefix: str = "/media/file") -> list[SnapshotEvent]:
+    return [
+        SnapshotEvent(event_type=SnapshotEventType.FILE_ADDED, path=f"{prefix}{i}")
+        for i in range(count)
+    ]
+
+
+def test_events_below_cap_stay_in_memory():
+    buffer = SpillingEventBuffer(max_in_memory=10)
+    events = make_events(10)
+    for event in events:
+        buffer.append(event)
+
+    assert len(buffer) == 10
+    assert buffer.spilled == 0
+    assert list(buffer.drain()) == events
+
+
+def test_events_past_cap_spill_and_keep_order():
+    buffer = SpillingEventBuffer(max_in_memory=3)
+    events = make_events(10)
+    for event in events:
+        buffer.append(event)
+
+    assert len(buffer) == 10
+    assert buffer.spilled == 7
+    assert list(buffer.drain()) == events
+    assert len(buffer) == 0
+
+
+def test_events_appended_while_draining_go_to_next_drain():
+    buffer = SpillingEventBuffer(max_in_memory=2)
+    first, second = make_events(5, "/a"), make_events(5, "/b")
+    for event in first:
+        buffer.append(event)
+
+    drained = []
+    for event in buffer.drain():
+        drained.append(event)
+        buffer.append(second[len(drained) - 1])
+
+    assert drained == first
+    assert list(buffer.drain()) == second
+
+
+def test_snapshot_streams_spilled_events_in_batches():
+    snapshot = Snapshot(
+        id="test",
+        state_store=InMemoryTreeSnapshotState("/media"),
+        event_buffer=SpillingEventBuffer(max_in_memory=4),
+    )
+    for i in range(10):
+        snapshot.add_file(f"/media/movies/{i}.mp4", STATS)
+
+    assert snapshot.pending_events == 10
+
+    batches = list(snapshot.pull_event_batches(batch_size=4))
+
+    assert [len(b) for b in batches] == [4, 4, 2]
+    assert [e.path for b in batches for e in b] == [
+        f"/media/movies/{i}.mp4" for i in range(10)
+    ]
+    assert snapshot.pending_events == 0
@@ -0,0 +1,206 @@
+import contextlib
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+import urllib.request
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+
+from ingest_watcher.bootstrap import IngestWatcherConfig
+from ingest_watcher.domain.events import SnapshotEvent, SnapshotEventType
+from ingest_watcher.infrastructure.event_journal import iter_records
+from ingest_watcher.supervisor import (
+    FRAME_ACK,
+    FRAME_NACK,
+    FrameRejectedError,
+    FrameSender,
+    RootSupervisor,
+    config_for_root,
+    root_key,
+)
+
+TIMEOUT = 30.0
+
+
+def free_ports(count: int) -> int:
+    """Find the first of `count` consecutive free ports."""
+    while True:
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            base = probe.getsockname()[1]
+        if base + count > 65536:
+            continue
+        try:
+            with contextlib.ExitStack() as stack:
+                for port in range(base, base + count):
+                    sock = stack.enter_context(socket.socket())
+                    sock.bind(("127.0.0.1", port))
+        except OSError:
+            continue
+        return base
+
+
+def wait_until(condition: Callable[[], bool]) -> None:
+    deadline = time.monotonic() + TIMEOUT
+    while not condition():
+        assert time.monotonic() < deadline, "Timed out"
+        time.sleep(0.05)
+
+
+def test_frames_hold_at_most_max_events_and_wait_for_their_reply():
+    receiver, sender = multiprocessing.Pipe()
+    frames = FrameSender(sender, max_events=2)
+    events = [
+        SnapshotEvent(event_type=SnapshotEventType.FILE_ADDED, path=f"/media/{i}.mkv")
+        for i in range(5)
+    ]
+    for reply in (FRAME_ACK, FRAME_ACK, FRAME_NACK):
+        receiver.send_bytes(reply)
+
+    for event in events:
+        frames(event)
+    with pytest.raises(FrameRejectedError):
+        frames.flush()
+    frames.flush()
+
+    received: list[list[SnapshotEvent]] = []
+    while receiver.poll():
+        received.append(list(iter_records(receiver.recv_bytes())))
+    assert [len(frame) for frame in received] == [2, 2, 1]
+    assert [e for frame in received for e in frame] == events
+
+
+def test_worker_config_is_derived_per_root(tmp_path: Path):
+    config = IngestWatcherConfig(
+        root_path="/media/movies",
+        root_paths=["/media/music"],
+        journal_path=str(tmp_path / "journal"),
+        scan_checkpoint_path=str(tmp_path / "scan.checkpoint"),
+        metrics_port=9100,
+    )
+
+    worker_config = config_for_root(config, "/media/music")
+
+    key = root_key("/media/music")
+    assert key.startswith("music-") and key != root_key("/other/music")
+    assert worker_config.root_path == "/media/music"
+    assert worker_config.root_paths == []
+    assert worker_config.journal_path == str(tmp_path / "journal" / key)
+    assert worker_config.scan_checkpoint_path == f"{tmp_path}/scan.checkpoint.{key}"
+    assert worker_config.scan_progress_path is None
+    assert worker_config.metrics_port == 9102
+    assert config_for_root(config, "/media/movies").metrics_port == 9101
+    no_metrics = config.model_copy(update={"metrics_port": None})
+    assert config_for_root(no_metrics, "/media/music").metrics_port is None
+
+
+def test_events_of_every_root_are_merged_and_crashed_workers_restart(
+    tmp_path: Path,
+):
+    roots = [tmp_path / "movies", tmp_path / "music"]
+    for root in roots:
+        (root / "a").mkdir(parents=True)
+        (root / "a" / "file.bin").write_bytes(root.name.encode())
+    metrics_port = free_ports(3)
+    config = IngestWatcherConfig(
+        root_path=str(roots[0]),
+        root_paths=[str(roots[1])],
+        worker_restart_delay=0.1,
+        profile_dir=str(tmp_path / "profiles"),
+        metrics_port=metrics_port,
+    )
+
+    lock = threading.Lock()
+    events: list[SnapshotEvent] = []
+
+    def processor(event: SnapshotEvent) -> None:
+        with lock:
+            events.append(event)
+
+    def added(path: Path) -> int:
+        with lock:
+            return sum(
+                e.path == str(path) and e.event_type == SnapshotEventType.FILE_ADDED
+                for e in events
+            )
+
+    supervisor = RootSupervisor(config, processor)
+    stop = threading.Event()
+    thread = threading.Thread(target=supervisor.run, args=(stop,))
+    thread.start()
+    try:
+        wait_until(lambda: all(added(root / "a" / "file.bin") for root in roots))
+        with lock:
+            root_events = [e.path for e in events if e.path.startswith(str(roots[0]))]
+        assert root_events == [f"{roots[0]}/a", f"{roots[0]}/a/file.bin"]
+
+        # every worker serves the metrics of its own root
+        for port in (metrics_port + 1, metrics_port + 2):
+            url = f"http://127.0.0.1:{port}/metrics"
+            with urllib.request.urlopen(url) as response:
+                body = response.read().decode()
+            assert "ingest_watcher_snapshot_entries 2" in body
+
+        # workers toggle profiling on SIGUSR1 instead of exiting
+        music_pid = supervisor.worker_pids[str(roots[1])]
+        assert music_pid is not None
+        os.kill(music_pid, signal.SIGUSR1)
+        time.sleep(0.2)
+        os.kill(music_pid, signal.SIGUSR1)
+        wait_until(lambda: any((tmp_path / "profiles").glob("profile-*.pstats")))
+
+        pid = supervisor.worker_pids[str(roots[0])]
+        assert pid is not None
+        os.kill(pid, signal.SIGKILL)
+
+        # the restarted worker scans its root again
+        wait_until(lambda: added(roots[0] / "a" / "file.bin") == 2)
+        assert supervisor.crashes == {str(roots[0]): 1, str(roots[1]): 0}
+        assert supervisor.worker_pids[str(roots[0])] not in (None, pid)
+    finally:
+        stop.set()
+        thread.join()
+
+    assert supervisor.worker_pids == {str(root): None for root in roots}
+
+
+def test_failed_frames_are_sent_again_and_do_not_stop_the_supervisor(
+    tmp_path: Path,
+):
+    root = tmp_path / "movies"
+    root.mkdir()
+    (root / "a.bin").write_bytes(b"a")
+    config = IngestWatcherConfig(
+        root_path=str(root),
+        journal_path=str(tmp_path / "journal"),
+        worker_restart_delay=0.1,
+    )
+
+    lock = threading.Lock()
+    failures: list[SnapshotEvent] = []
+    events: list[SnapshotEvent] = []
+
+    def processor(event: SnapshotEvent) -> None:
+        with lock:
+            if not failures:
+                failures.append(event)
+                raise RuntimeError("ingest is down")
+            events.append(event)
+
+    supervisor = RootSupervisor(config, processor)
+    stop = threading.Event()
+    thread = threading.Thread(target=supervisor.run, args=(stop,))
+    thread.start()
+    try:
+        # the rejected worker exits, its restart replays the journal
+        wait_until(lambda: any(e.path == str(root / "a.bin") for e in events))
+        assert thread.is_alive()
+        assert supervisor.crashes == {str(root): 1}
+    finally:
+        stop.set()
+        thread.join()